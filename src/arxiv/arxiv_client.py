@@ -5,11 +5,23 @@ Wrapper rond de officiële arxiv.py client met rate limiting compliance
 
 import arxiv
 import logging
+import os
+import time
+from pathlib import Path
 from typing import List, Dict, Optional
 
+import requests
+
 # Import configuratie
 from src.config import PROCESSING_CONFIG
 
+_ARXIV_BASE_URL = "https://arxiv.org"
+# Grote blokken: minder Python-iteraties en write-syscalls per MB
+_DOWNLOAD_CHUNK_BYTES = 1 << 20
+# Eén gedeelde sessie per proces: keep-alive hergebruikt de TCP/TLS-verbinding
+# (ook ToU: 1 verbinding)
+_SESSION = requests.Session()
+
 
 class ArxivClient:
     def __init__(self):
@@ -24,8 +36,13 @@ class ArxivClient:
         # Load processing configuration
         self.processing_config = PROCESSING_CONFIG
         self.rate_limit = self.processing_config["api_rate_limit_seconds"]
+        self.download_rate_limit = float(
+            self.processing_config.get("download_rate_limit_seconds", 3)
+        )
+        self.download_timeout = float(self.processing_config.get("download_timeout_seconds", 60))
+        self._last_download = 0.0
 
-        self.logger.info(f"ArXiv Client initialized with {self.rate_limit}s rate limiting")
+        self.logger.info("ArXiv Client initialized with %ss rate limiting", self.rate_limit)
         self.logger.info("Using official arxiv.py client with built-in rate limiting")
 
     def search_papers(
@@ -39,7 +56,9 @@ class ArxivClient:
             max_results: Maximum aantal resultaten
             sort_by: Sortering ("submittedDate", "lastUpdatedDate", "relevance")
         """
-        self.logger.info(f"Zoeken naar papers: '{query}' (max: {max_results}, sort: {sort_by})")
+        self.logger.info(
+            "Zoeken naar papers: '%s' (max: %s, sort: %s)", query, max_results, sort_by
+        )
 
         try:
             # Map sort_by string naar arxiv SortCriterion
@@ -82,13 +101,13 @@ class ArxivClient:
 
                 # Log progress every 10 papers
                 if result_count % 10 == 0:
-                    self.logger.info(f"Verwerkt {result_count} papers...")
+                    self.logger.info("Verwerkt %s papers...", result_count)
 
-            self.logger.info(f"Totaal gevonden papers: {len(papers)}")
+            self.logger.info("Totaal gevonden papers: %s", len(papers))
             return papers
 
         except Exception as e:
-            self.logger.error(f"ArXiv search failed: {e}")
+            self.logger.error("ArXiv search failed: %s", e)
             raise
 
     def search_by_ids(self, arxiv_ids: List[str]) -> List[Dict]:
@@ -98,7 +117,7 @@ class ArxivClient:
         Args:
             arxiv_ids: List van arXiv IDs (bijv. ["2023.12345v1", "2023.12346v1"])
         """
-        self.logger.info(f"Zoeken papers by IDs: {len(arxiv_ids)} IDs")
+        self.logger.info("Zoeken papers by IDs: %s IDs", len(arxiv_ids))
 
         try:
             search = arxiv.Search(id_list=arxiv_ids)
@@ -123,12 +142,40 @@ class ArxivClient:
                 }
                 papers.append(paper_data)
 
-            self.logger.info(f"Gevonden papers by ID: {len(papers)}")
+            self.logger.info("Gevonden papers by ID: %s", len(papers))
             return papers
 
         except Exception as e:
-            self.logger.error(f"ArXiv search by IDs failed: {e}")
+            self.logger.error("ArXiv search by IDs failed: %s", e)
+            raise
+
+    def _wait_for_download_slot(self) -> None:
+        """Houd minimaal download_rate_limit_seconds tussen opeenvolgende downloads (arXiv ToU)."""
+        wait = self._last_download + self.download_rate_limit - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        self._last_download = time.monotonic()
+
+    def _stream_download(self, url: str, dest: Path) -> str:
+        """Stream een bestand in grote blokken naar dest via de gedeelde HTTP-sessie.
+
+        Er wordt eerst naar een .part-bestand geschreven; pas na een volledige download
+        wordt het hernoemd, zodat een afgebroken download geen half bestand achterlaat.
+        """
+        self._wait_for_download_slot()
+        tmp = dest.with_name(dest.name + ".part")
+        try:
+            with _SESSION.get(url, stream=True, timeout=self.download_timeout) as response:
+                response.raise_for_status()
+                with open(tmp, "wb", buffering=_DOWNLOAD_CHUNK_BYTES) as fh:
+                    for chunk in response.iter_content(chunk_size=_DOWNLOAD_CHUNK_BYTES):
+                        fh.write(chunk)
+            os.replace(tmp, dest)
+        except BaseException:
+            # Ook bij een timeout of Ctrl-C halverwege geen .part-bestand laten staan
+            tmp.unlink(missing_ok=True)
             raise
+        return str(dest)
 
     def download_paper_source(
         self, arxiv_id: str, dirpath: str, filename: Optional[str] = None
@@ -139,27 +186,19 @@ class ArxivClient:
         Args:
             arxiv_id: ArXiv ID
             dirpath: Directory om naar te downloaden
-            filename: Optionele custom filename
+            filename: Optionele custom filename (standaard: <arxiv_id>.tar.gz)
 
         Returns:
             Pad naar gedownload bestand
         """
         try:
-            # Zoek de paper eerst
-            search = arxiv.Search(id_list=[arxiv_id])
-            paper = next(self.client.results(search))
-
-            # Download source met de ingebouwde functie
-            if filename:
-                filepath = paper.download_source(dirpath=dirpath, filename=filename)
-            else:
-                filepath = paper.download_source(dirpath=dirpath)
-
-            self.logger.info(f"Source downloaded: {filepath}")
+            dest = Path(dirpath) / (filename or f"{arxiv_id.replace('/', '_')}.tar.gz")
+            filepath = self._stream_download(f"{_ARXIV_BASE_URL}/src/{arxiv_id}", dest)
+            self.logger.info("Source downloaded: %s", filepath)
             return filepath
 
         except Exception as e:
-            self.logger.error(f"Failed to download source for {arxiv_id}: {e}")
+            self.logger.error("Failed to download source for %s: %s", arxiv_id, e)
             raise
 
     def download_paper_pdf(
@@ -171,25 +210,17 @@ class ArxivClient:
         Args:
             arxiv_id: ArXiv ID
             dirpath: Directory om naar te downloaden
-            filename: Optionele custom filename
+            filename: Optionele custom filename (standaard: <arxiv_id>.pdf)
 
         Returns:
             Pad naar gedownload bestand
         """
         try:
-            # Zoek de paper eerst
-            search = arxiv.Search(id_list=[arxiv_id])
-            paper = next(self.client.results(search))
-
-            # Download PDF met de ingebouwde functie
-            if filename:
-                filepath = paper.download_pdf(dirpath=dirpath, filename=filename)
-            else:
-                filepath = paper.download_pdf(dirpath=dirpath)
-
-            self.logger.info(f"PDF downloaded: {filepath}")
+            dest = Path(dirpath) / (filename or f"{arxiv_id.replace('/', '_')}.pdf")
+            filepath = self._stream_download(f"{_ARXIV_BASE_URL}/pdf/{arxiv_id}", dest)
+            self.logger.info("PDF downloaded: %s", filepath)
             return filepath
 
         except Exception as e:
-            self.logger.error(f"Failed to download PDF for {arxiv_id}: {e}")
+            self.logger.error("Failed to download PDF for %s: %s", arxiv_id, e)
             raise
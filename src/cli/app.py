@@ -1,8 +1,6 @@
-import logging
-import logging.config
 import click
 
-from src.config import LOGGING_CONFIG
+from src.logging_setup import setup_logging
 from src.workflows.labeling import run_labeling
 from src.workflows.imports import (
     run_metadata_import,
@@ -10,14 +8,20 @@ from src.workflows.imports import (
     import_labels_questions,
 )
 from src.workflows.queues import run_prepare_metadata_labeling, run_prepare_paper_download
-from src.workflows.reporting import print_stats, list_questions, download_queue_summary
+from src.workflows.reporting import (
+    all_reports,
+    iter_download_queue_summary,
+    list_questions,
+    print_stats,
+)
 from src.workflows.downloads import run_downloads
 from src.workflows.conversion import convert_to_md
+from src.workflows.pipeline import run_download_and_convert
 
 
 @click.group()
 def cli():
-    logging.config.dictConfig(LOGGING_CONFIG)
+    setup_logging()
 
 
 @cli.command("label")
@@ -86,6 +90,17 @@ def cli_stats():
     print_stats()
 
 
+@cli.command("report")
+def cli_report():
+    reports = all_reports()
+    print_stats(reports["table_counts"])
+    for line in list_questions(reports["questions"]):
+        click.echo(line)
+    click.echo("")
+    for line in iter_download_queue_summary(reports["download_queue"]):
+        click.echo(line)
+
+
 def main():
     cli()
 
@@ -99,7 +114,7 @@ def cli_run_download(limit: int | None):
 
 @cli.command("download-summary")
 def cli_download_summary():
-    for line in download_queue_summary():
+    for line in iter_download_queue_summary():
         click.echo(line)
 
 
@@ -107,3 +122,10 @@ def cli_download_summary():
 def cli_convert_md():
     stats = convert_to_md()
     click.echo(stats)
+
+
+@cli.command("download-convert")
+@click.option("--limit", type=int, default=None, help="Max aantal downloads")
+def cli_download_convert(limit: int | None):
+    stats = run_download_and_convert(limit=limit)
+    click.echo(stats)
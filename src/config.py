@@ -3,6 +3,11 @@ Configuratie voor GitHub Copilot Metastudy
 Alle aanpasbare parameters voor het systeem
 """
 
+from pathlib import Path
+
+# Projectroot (map boven src/); eenmalig bepaald, resolve() raakt het bestandssysteem
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
 # ArXiv Search Configuration
 SEARCH_CONFIG = {
     # Zoektermen voor verschillende aspecten van AI-assisted programming
@@ -26,16 +31,29 @@ SEARCH_CONFIG = {
 
 # Database Configuration (PostgreSQL only)
 DATABASE_CONFIG = {
-    "pg": {"host": "0.0.0.0", "port": 5432, "dbname": "arxiv", "user": "arxiv", "password": "arxiv"}
+    "pg": {
+        "host": "0.0.0.0",
+        "port": 5432,
+        "dbname": "arxiv",
+        "user": "arxiv",
+        "password": "arxiv",
+        # Sessie-instellingen, eenmalig bij het openen van de verbinding meegegeven.
+        # synchronous_commit=off: commit wacht niet op WAL-fsync; bij een crash kunnen de
+        # laatste transacties verloren gaan, maar de database blijft consistent (ETL-workload).
+        "options": "-c synchronous_commit=off",
+    }
 }
 
 # File Storage Configuration
 STORAGE_CONFIG = {
     # Directories die daadwerkelijk gebruikt worden
+    "tex_directory": "data/tex",
     "pdf_directory": "data/pdf",
     "markdown_directory": "data/md",
     # Minimum grootte voor geldig markdown bestand
     "min_markdown_size_bytes": 100,
+    # Aantal worker-processen voor PDF -> MD conversie (None = os.cpu_count())
+    "convert_workers": None,
 }
 
 # Processing Configuration
@@ -45,6 +63,12 @@ PROCESSING_CONFIG = {
     "download_rate_limit_seconds": 3,
     # Timeout voor PDF downloads
     "download_timeout_seconds": 60,
+    # Labeling jobs die langer dan dit aantal minuten IN_FLIGHT staan (bv. na een crash)
+    # worden bij de start van een labeling-run teruggezet naar PENDING
+    "labeling_stale_minutes": 60,
+    # PDF -> MD backend: 'pdfplumber' (standaard) of 'pymupdf4llm' (sneller, optionele
+    # dependency: pip install pymupdf4llm)
+    "pdf_converter": "pdfplumber",
 }
 
 # Download Workflow Configuration
@@ -64,10 +88,12 @@ LOGGING_CONFIG = {
     "disable_existing_loggers": False,
     "formatters": {
         "standard": {
+            "class": "src.logging_setup.FastFormatter",
             "format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
             "datefmt": "%Y-%m-%d %H:%M:%S",
         },
         "detailed": {
+            "class": "src.logging_setup.FastFormatter",
             "format": (
                 "%(asctime)s - %(name)s - %(levelname)s - %(module)s:%(lineno)d - %(message)s"
             ),
@@ -82,13 +108,18 @@ LOGGING_CONFIG = {
             "stream": "ext://sys.stdout",
         },
         "file": {
-            "class": "logging.handlers.RotatingFileHandler",
+            "class": "src.logging_setup.BufferedRotatingFileHandler",
             "level": "INFO",
             "formatter": "detailed",
             "filename": "metastudy.log",
             "maxBytes": 10485760,  # 10MB
             "backupCount": 5,
             "encoding": "utf-8",
+            # Bestand pas openen bij de eerste logregel
+            "delay": True,
+            # 64KB schrijfbuffer, flush hooguit eens per seconde
+            "buffer_size": 65536,
+            "flush_interval": 1.0,
         },
     },
     "loggers": {
@@ -107,7 +138,14 @@ LOGGING_CONFIG = {
 # LLM Configuration (gesplitst: general, ollama, vertex)
 LLM_GENERAL_CONFIG = {
     "batch_size": 2,
-    # Provider: 'ollama' of 'vertex'
+    # Aantal title/abstract-paren (zelfde vraag) per classificatie-aanroep
+    "classify_batch_size": 8,
+    # Maximaal geschatte input-tokens (±4 tekens/token) per title/abstract-paar;
+    # langere abstracts worden vóór verzending ingekort (None = geen limiet)
+    "max_input_tokens": 2048,
+    # Persistente cache van classificaties (relatief aan project root; None = uit)
+    "result_cache_path": "data/llm_cache.sqlite",
+    # Provider: 'ollama', 'vertex' of 'llama_cpp'
     "provider": "vertex",
 }
 
@@ -126,6 +164,29 @@ LLM_OLLAMA_CONFIG = {
     "max_chars_per_chunk": 12000,
 }
 
+LLM_LLAMA_CPP_CONFIG = {
+    # Lokaal GGUF-model, in-process geladen via llama-cpp-python (zonder Ollama HTTP-server)
+    "model_path": "models/gemma-3-12b-it-q4_0.gguf",
+    "model_name": "gemma-3-12b-it-q4_0",
+    "n_ctx": 8192,
+    "n_batch": 512,
+    # None = llama.cpp kiest zelf het aantal threads
+    "n_threads": None,
+    # -1 = alle lagen op de GPU indien beschikbaar
+    "n_gpu_layers": -1,
+    "temperature": 0.1,
+    "format": "json",
+    "max_tokens": 4096,
+    "top_p": 0.9,
+    "top_k": 40,
+    # Inferentie is per model geserialiseerd; meer dan 1 levert geen extra doorvoer op
+    "batch_size": 1,
+    # Maximum aantal karakters per chunk voor de LLM converter. Prompt + output moeten samen in
+    # n_ctx passen: ~8000 tekens LaTeX is ±2.5k tokens in en ongeveer evenveel uit, plus de
+    # systeemprompt. max_tokens wordt daarnaast per aanroep begrensd tot de resterende context.
+    "max_chars_per_chunk": 8000,
+}
+
 LLM_VERTEX_CONFIG = {
     # Authenticatie via gcloud ADC (application-default credentials)
     "project": "bennekers",
@@ -134,6 +195,9 @@ LLM_VERTEX_CONFIG = {
     "model_name": "gemini-2.5-flash",
     # Optioneel: API versie configureren
     "api_version": "v1",
+    # HTTP/2 multiplexing en connection pool voor de async (httpx) transport
+    "http2": True,
+    "max_connections": 32,
     # Tuning opties voor Vertex AI (GenerateContentConfig)
     "temperature": 0.1,
     "top_p": 0.9,
@@ -142,8 +206,15 @@ LLM_VERTEX_CONFIG = {
     "max_output_tokens": 4096,
     # Concurrency limiet voor Vertex requests (globaal per proces)
     "batch_size": 4,
+    # Proactieve quota-begrenzing (None = geen limiet); voorkomt 429's en backoff
+    "requests_per_minute": None,
+    "tokens_per_minute": None,
     # Maximum aantal karakters per chunk voor de LLM converter
     "max_chars_per_chunk": 20000,
+    # Aantal chunks dat samen in één generate_content request mag (gescheiden door delimiter)
+    "chunks_per_request": 4,
+    # Bovengrens voor het totaal aantal karakters van een gebundeld request
+    "max_chars_per_request": 40000,
 }
 
 # User Interface Configuration
@@ -152,6 +223,7 @@ UI_CONFIG = {"show_progress_bars": True, "show_statistics": True}
 # Export deze configuraties voor gemakkelijke import
 __all__ = [
     "SEARCH_CONFIG",
+    "PROJECT_ROOT",
     "DATABASE_CONFIG",
     "STORAGE_CONFIG",
     "PROCESSING_CONFIG",
@@ -159,6 +231,7 @@ __all__ = [
     "LOGGING_CONFIG",
     "LLM_GENERAL_CONFIG",
     "LLM_OLLAMA_CONFIG",
+    "LLM_LLAMA_CPP_CONFIG",
     "LLM_VERTEX_CONFIG",
     "UI_CONFIG",
 ]
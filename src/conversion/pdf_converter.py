@@ -1,26 +1,35 @@
-"""PDF -> Markdown conversie met pdfplumber."""
+"""PDF -> Markdown conversie met pdfplumber of (optioneel) pymupdf4llm."""
 
 import logging
 from pathlib import Path
 import pdfplumber
 
+from src.config import PROCESSING_CONFIG, STORAGE_CONFIG
+
 logger = logging.getLogger(__name__)
 
+_PDF_DIR = Path(STORAGE_CONFIG["pdf_directory"])
+_MD_DIR = Path(STORAGE_CONFIG["markdown_directory"])
+
 
 def pdf_naar_md(arxiv_id: str) -> str:
-    pdf_dir = Path("data") / "pdf"
-    md_dir = Path("data") / "md"
-    md_dir.mkdir(parents=True, exist_ok=True)
+    _MD_DIR.mkdir(parents=True, exist_ok=True)
 
-    input_path = pdf_dir / f"{arxiv_id}.pdf"
-    output_path = md_dir / f"{arxiv_id}.md"
+    input_path = _PDF_DIR / f"{arxiv_id}.pdf"
+    output_path = _MD_DIR / f"{arxiv_id}.md"
 
-    if not input_path.exists():
-        raise FileNotFoundError(f"PDF bronbestand niet gevonden: {input_path}")
+    if PROCESSING_CONFIG.get("pdf_converter") == "pymupdf4llm":
+        return _pdf_naar_md_pymupdf(input_path, output_path)
+
+    # Eén open-poging i.p.v. exists() + open: geen extra stat en geen race met verwijderen
+    try:
+        pdf_doc = pdfplumber.open(str(input_path))
+    except FileNotFoundError:
+        raise FileNotFoundError(f"PDF bronbestand niet gevonden: {input_path}") from None
 
     logger.info("Converteer PDF naar MD: %s -> %s", input_path, output_path)
     parts: list[str] = []
-    with pdfplumber.open(str(input_path)) as pdf:
+    with pdf_doc as pdf:
         for page_num, page in enumerate(pdf.pages, start=1):
             txt = page.extract_text() or ""
             if txt:
@@ -31,3 +40,19 @@ def pdf_naar_md(arxiv_id: str) -> str:
     content = "\n\n".join(parts).strip()
     output_path.write_text(content, encoding="utf-8")
     return str(output_path)
+
+
+def _pdf_naar_md_pymupdf(input_path: Path, output_path: Path) -> str:
+    """Converteer met pymupdf4llm (MuPDF in C, Markdown met koppen en tabellen)."""
+    try:
+        import pymupdf4llm
+    except ImportError as e:
+        raise RuntimeError("pymupdf4llm is niet geïnstalleerd (pip install pymupdf4llm)") from e
+
+    if not input_path.is_file():
+        raise FileNotFoundError(f"PDF bronbestand niet gevonden: {input_path}")
+
+    logger.info("Converteer PDF naar MD (pymupdf4llm): %s -> %s", input_path, output_path)
+    content = pymupdf4llm.to_markdown(str(input_path), show_progress=False).strip()
+    output_path.write_text(content, encoding="utf-8")
+    return str(output_path)
@@ -4,16 +4,19 @@ import logging
 import subprocess
 from pathlib import Path
 
+from src.config import STORAGE_CONFIG
+
 logger = logging.getLogger(__name__)
 
+_TEX_DIR = Path(STORAGE_CONFIG["tex_directory"])
+_MD_DIR = Path(STORAGE_CONFIG["markdown_directory"])
+
 
 def tex_naar_md(arxiv_id: str) -> str:
-    tex_dir = Path("data") / "tex"
-    md_dir = Path("data") / "md"
-    md_dir.mkdir(parents=True, exist_ok=True)
+    _MD_DIR.mkdir(parents=True, exist_ok=True)
 
-    tex_path = tex_dir / f"{arxiv_id}.tex"
-    md_path = md_dir / f"{arxiv_id}.md"
+    tex_path = _TEX_DIR / f"{arxiv_id}.tex"
+    md_path = _MD_DIR / f"{arxiv_id}.md"
 
     if not tex_path.exists():
         raise FileNotFoundError(f"TeX bronbestand niet gevonden: {tex_path}")
@@ -50,8 +53,7 @@ def tex_naar_md(arxiv_id: str) -> str:
             from src.llm.llm_converter import build_markdown_from_latex
 
             latex_content = tex_path.read_text(encoding="utf-8", errors="ignore")
-            md_content = build_markdown_from_latex(latex_content)
-            md_path.write_text(md_content, encoding="utf-8")
+            build_markdown_from_latex(latex_content, output_path=str(md_path))
             logger.info("LLM fallback voltooid voor %s", tex_path)
             return str(md_path)
         except Exception as le:  # pragma: no cover
@@ -3,6 +3,6 @@ Database module voor GitHub Copilot Metastudy
 Handles alle database gerelateerde functionaliteit
 """
 
-from .database import PaperDatabase
+from .database import PaperDatabase, get_db
 
-__all__ = ["PaperDatabase"]
+__all__ = ["PaperDatabase", "get_db"]
@@ -3,6 +3,11 @@ Shared database utilities (connection, logging).
 """
 
 import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
 import psycopg
 from psycopg.rows import dict_row
 
@@ -12,9 +17,11 @@ from src.config import DATABASE_CONFIG
 class BaseDatabase:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
+        # Per thread één open verbinding, hergebruikt over _connect()-aanroepen heen
+        self._local = threading.local()
 
-    def _connect(self):
-        """Return a PostgreSQL connection with dict_row factory."""
+    def _open_connection(self) -> psycopg.Connection:
+        """Open een nieuwe PostgreSQL verbinding met dict_row factory."""
         pg = DATABASE_CONFIG["pg"]
         conn = psycopg.connect(
             host=pg["host"],
@@ -22,6 +29,43 @@ class BaseDatabase:
             dbname=pg["dbname"],
             user=pg["user"],
             password=pg["password"],
+            options=pg.get("options", ""),
         )
         conn.row_factory = dict_row
         return conn
+
+    @contextmanager
+    def _connect(self) -> Iterator[psycopg.Connection]:
+        """Geef een verbinding voor één unit of work.
+
+        Zelfde semantiek als ``with psycopg.connect() as conn`` (commit bij succes, rollback
+        bij een fout), maar de verbinding blijft per thread open voor de volgende aanroep.
+        Een geneste aanroep in dezelfde thread krijgt een eigen, kortlevende verbinding, zodat
+        zijn commit de transactie (of server-side cursor) van de buitenste niet raakt.
+        Na een fork opent het kindproces een eigen verbinding.
+        """
+        local = self._local
+        if getattr(local, "in_use", False):
+            with self._open_connection() as nested:
+                yield nested
+            return
+
+        conn = getattr(local, "conn", None)
+        if conn is None or conn.closed or getattr(local, "pid", None) != os.getpid():
+            conn = self._open_connection()
+            local.conn = conn
+            local.pid = os.getpid()
+
+        local.in_use = True
+        try:
+            yield conn
+            if not conn.closed:
+                conn.commit()
+        except BaseException:
+            if conn.broken:
+                local.conn = None
+            elif not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            local.in_use = False
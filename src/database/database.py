@@ -1,5 +1,6 @@
 """High-level PaperDatabase composing schema and repositories."""
 
+from functools import lru_cache
 from typing import List, Dict, Optional
 
 from .metadata_repo import MetadataRepository
@@ -16,3 +17,9 @@ class PaperDatabase(MetadataRepository, PapersRepository, LabelsRepository, Queu
         self.ensure_papers_tables()
         self.ensure_labels_tables()
         self.ensure_queue_tables()
+
+
+@lru_cache(maxsize=1)
+def get_db() -> PaperDatabase:
+    """Gedeelde PaperDatabase per proces: schema-check en verbindingen maar één keer opzetten."""
+    return PaperDatabase()
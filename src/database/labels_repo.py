@@ -143,6 +143,54 @@ class LabelsRepository(BaseDatabase):
             )
             conn.commit()
 
+    def upsert_metadata_labels_many(
+        self, rows: List[tuple[str, int, float | None]]
+    ) -> None:
+        """Upsert meerdere (metadata_id, label_id, confidence_score) rijen in één statement."""
+        if not rows:
+            return
+        with self._connect() as conn:
+            cur = conn.cursor()
+            self._upsert_metadata_labels(cur, rows)
+            conn.commit()
+
+    @staticmethod
+    def _upsert_metadata_labels(cur, rows: List[tuple[str, int, float | None]]) -> None:
+        """Upsert label-rijen op een open cursor; de aanroeper commit."""
+        # Dedup op de conflict-key: ON CONFLICT DO UPDATE mag een rij maar één keer raken
+        latest: dict[tuple[str, int], float | None] = {}
+        for metadata_id, label_id, confidence in rows:
+            if not metadata_id:
+                raise ValueError("metadata_id is verplicht")
+            if not isinstance(label_id, int) or label_id <= 0:
+                raise ValueError("label_id moet een positief integer zijn")
+            latest[(metadata_id, label_id)] = confidence
+        if not latest:
+            return
+        now_iso = datetime.now().isoformat()
+        # Drie arrays als parameters i.p.v. een parameterset per rij
+        cur.execute(
+            """
+            INSERT INTO metadata_labels (
+                metadata_id, label_id, confidence_score, created_at, updated_at
+            )
+            SELECT u.metadata_id, u.label_id, u.confidence_score, %s::timestamp, %s::timestamp
+            FROM unnest(%s::text[], %s::int[], %s::numeric[])
+                AS u(metadata_id, label_id, confidence_score)
+            ON CONFLICT (metadata_id, label_id)
+            DO UPDATE SET
+                confidence_score = EXCLUDED.confidence_score,
+                updated_at = EXCLUDED.updated_at
+            """,
+            (
+                now_iso,
+                now_iso,
+                [metadata_id for metadata_id, _ in latest],
+                [label_id for _, label_id in latest],
+                list(latest.values()),
+            ),
+        )
+
     def get_metadata_ids_by_label(self, label_id: int) -> List[str]:
         if not isinstance(label_id, int) or label_id <= 0:
             raise ValueError("label_id moet een positief integer zijn")
@@ -191,3 +239,35 @@ class LabelsRepository(BaseDatabase):
                 """
             )
             return [{"id": int(row["id"]), "name": row["name"]} for row in cur.fetchall()]
+
+    def list_questions_and_labels(self) -> List[dict]:
+        """Retourneer questions en labels in één query (UNION ALL).
+
+        Keys: kind ('q' of 'l'), id, name, label_id, label_name. Voor labels zijn label_id en
+        label_name gelijk aan id en name. Volgorde: eerst questions (zoals list_questions),
+        daarna labels (zoals list_labels).
+        """
+        with self._connect() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                """
+                SELECT 'q' AS kind, q.id, q.name, l.id AS label_id, l.name AS label_name,
+                       l.name AS sort_name
+                FROM questions q
+                JOIN labels l ON q.label_id = l.id
+                UNION ALL
+                SELECT 'l' AS kind, id, name, id AS label_id, name AS label_name, name AS sort_name
+                FROM labels
+                ORDER BY kind DESC, sort_name, name, id
+                """
+            )
+            return [
+                {
+                    "kind": row["kind"],
+                    "id": int(row["id"]),
+                    "name": row["name"],
+                    "label_id": int(row["label_id"]),
+                    "label_name": row["label_name"],
+                }
+                for row in cur.fetchall()
+            ]
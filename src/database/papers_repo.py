@@ -39,6 +39,53 @@ class PapersRepository(BaseDatabase):
             cur.execute("SELECT 1 FROM papers WHERE arxiv_id = %s", (arxiv_id,))
             return cur.fetchone() is not None
 
+    def papers_exist(self, arxiv_ids: List[str]) -> set[str]:
+        """Geef de subset van arxiv_ids terug die al in papers staat (één query)."""
+        if not arxiv_ids:
+            return set()
+        with self._connect() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT arxiv_id FROM papers WHERE arxiv_id = ANY(%s)", (list(arxiv_ids),)
+            )
+            return {row["arxiv_id"] for row in cur.fetchall()}
+
+    def insert_papers_bulk(self, rows: List[Dict]) -> int:
+        """Voeg meerdere papers in één transactie toe; bestaande arxiv_ids worden overgeslagen.
+
+        Returns: aantal daadwerkelijk toegevoegde rijen
+        """
+        if not rows:
+            return 0
+        now_iso = datetime.now().isoformat()
+        with self._connect() as conn:
+            cur = conn.cursor()
+            cur.executemany(
+                """
+                INSERT INTO papers (
+                    arxiv_id, download_status, download_type, llm_check_status,
+                    created_at, updated_at, metadata_id
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (arxiv_id) DO NOTHING
+                """,
+                [
+                    (
+                        row["arxiv_id"],
+                        row.get("download_status", "PENDING"),
+                        row.get("download_type", "PENDING"),
+                        row.get("llm_check_status", "PENDING"),
+                        now_iso,
+                        now_iso,
+                        row.get("metadata_id"),
+                    )
+                    for row in rows
+                ],
+            )
+            inserted = max(cur.rowcount, 0)
+            conn.commit()
+        self.logger.info("Papers batch inserted: %s records", inserted)
+        return inserted
+
     def insert_paper(self, paper_data: Dict) -> None:
         with self._connect() as conn:
             explicit_metadata_id = paper_data.get("metadata_id")
@@ -76,7 +123,7 @@ class PapersRepository(BaseDatabase):
                 ),
             )
             conn.commit()
-        self.logger.info(f"Paper inserted: {paper_data['arxiv_id']}")
+        self.logger.info("Paper inserted: %s", paper_data["arxiv_id"])
 
     def get_papers_by_status(
         self, download_status: str = None, download_type: str = None, llm_status: str = None
@@ -122,7 +169,7 @@ class PapersRepository(BaseDatabase):
             cur = conn.cursor()
             cur.execute(query, params)
             conn.commit()
-        self.logger.info(f"Paper updated: {arxiv_id} - {kwargs}")
+        self.logger.info("Paper updated: %s - %s", arxiv_id, kwargs)
 
     def get_paper_by_id(self, arxiv_id: str) -> Optional[Dict]:
         with self._connect() as conn:
@@ -1,10 +1,14 @@
 """Repository voor queues, waaronder labeling_queue en download_queue."""
 
-import json
 import re
-from typing import Optional, List, Tuple
+from typing import Optional, List
+
+import orjson
 
 from .base import BaseDatabase
+from .labels_repo import LabelsRepository
+
+_VERSION_RE = re.compile(r"(?i)v?(\d+)")
 
 
 class QueuesRepository(BaseDatabase):
@@ -25,6 +29,15 @@ class QueuesRepository(BaseDatabase):
                 )
                 """
             )
+            # Checkpointing: gepopte jobs staan IN_FLIGHT tot hun resultaat is weggeschreven
+            cur.execute(
+                "ALTER TABLE labeling_queue "
+                "ADD COLUMN IF NOT EXISTS status TEXT NOT NULL DEFAULT 'PENDING'"
+            )
+            cur.execute("ALTER TABLE labeling_queue ADD COLUMN IF NOT EXISTS started_at TIMESTAMP")
+            cur.execute(
+                "CREATE INDEX IF NOT EXISTS idx_labeling_queue_status ON labeling_queue(status)"
+            )
             # download_queue voor paper downloads op basis van arxiv_id (incl. versie)
             cur.execute(
                 """
@@ -39,10 +52,13 @@ class QueuesRepository(BaseDatabase):
                 )
                 """
             )
-            # Optionele index op status
+            # Covering index op (status, created_at): dient get_pending_downloads (filter + ORDER BY
+            # zonder sort) en de samenvatting per status. Vervangt de index op alleen status.
             cur.execute(
-                "CREATE INDEX IF NOT EXISTS idx_download_queue_status ON download_queue(download_status)"
+                "CREATE INDEX IF NOT EXISTS idx_download_queue_status_created "
+                "ON download_queue(download_status, created_at) INCLUDE (arxiv_id)"
             )
+            cur.execute("DROP INDEX IF EXISTS idx_download_queue_status")
             conn.commit()
 
     def prepare_metadata_labeling(self, question_id: int, date_after: Optional[str] = None) -> int:
@@ -59,36 +75,38 @@ class QueuesRepository(BaseDatabase):
         Returns
         -------
         int
-            Aantal metadata records waarvoor een enqueue poging is gedaan
-            (per record één rij met opgegeven question_id).
+            Aantal nieuw ingevoegde queue-rijen. Records die al in de queue staan of
+            al het label van de vraag dragen, worden overgeslagen.
         """
+        # Selectie en dedup volledig in SQL: geen id-lijsten in Python-geheugen.
+        # NOT EXISTS gebruikt de primary key (metadata_id, label_id) van metadata_labels.
+        date_filter = "AND m.update_date > CAST(%s AS DATE)" if date_after else ""
+        params: List = [question_id, question_id]
+        if date_after:
+            params.append(date_after)
         with self._connect() as conn:
             cur = conn.cursor()
-            if date_after:
-                cur.execute(
-                    "SELECT id FROM metadata WHERE update_date > CAST(%s AS DATE) AND (string_to_array(categories, ' ') @> ARRAY['cs.AI'] OR string_to_array(categories, ' ') @> ARRAY['cs.SE'])",
-                    (date_after,),
-                )
-            else:
-                cur.execute(
-                    "SELECT id FROM metadata WHERE (string_to_array(categories, ' ') @> ARRAY['cs.AI'] OR string_to_array(categories, ' ') @> ARRAY['cs.SE'])"
-                )
-
-            metadata_ids: List[str] = [row["id"] for row in cur.fetchall()]
-            if not metadata_ids:
-                return 0
-
-            params: List[Tuple[str, int]] = [(mid, question_id) for mid in metadata_ids]
-            cur.executemany(
-                """
+            cur.execute(
+                f"""
                 INSERT INTO labeling_queue (metadata_id, question_id)
-                VALUES (%s, %s)
+                SELECT m.id, %s
+                FROM metadata m
+                WHERE (string_to_array(m.categories, ' ') @> ARRAY['cs.AI']
+                       OR string_to_array(m.categories, ' ') @> ARRAY['cs.SE'])
+                  AND NOT EXISTS (
+                      SELECT 1
+                      FROM metadata_labels ml
+                      JOIN questions q ON q.label_id = ml.label_id
+                      WHERE q.id = %s AND ml.metadata_id = m.id
+                  )
+                  {date_filter}
                 ON CONFLICT (metadata_id, question_id) DO NOTHING
                 """,
                 params,
             )
+            inserted = cur.rowcount or 0
             conn.commit()
-            return len(metadata_ids)
+            return inserted
 
     def prepare_paper_download(self, label_id: int) -> int:
         """Vul download_queue met arxiv_id's (incl. laatste versie) voor een gegeven label.
@@ -110,7 +128,7 @@ class QueuesRepository(BaseDatabase):
             if not versions_json:
                 return 1
             try:
-                versions = json.loads(versions_json)
+                versions = orjson.loads(versions_json)
                 if not isinstance(versions, list) or not versions:
                     return 1
                 max_num = 1
@@ -118,7 +136,7 @@ class QueuesRepository(BaseDatabase):
                     v = entry.get("version") if isinstance(entry, dict) else None
                     num = None
                     if isinstance(v, str):
-                        m = re.search(r"(?i)v?(\d+)", v.strip())
+                        m = _VERSION_RE.search(v.strip())
                         if m:
                             num = int(m.group(1))
                     elif isinstance(v, (int, float)):
@@ -178,7 +196,8 @@ class QueuesRepository(BaseDatabase):
             cur = conn.cursor()
             # pak één item deterministisch
             cur.execute(
-                "SELECT metadata_id, question_id FROM labeling_queue ORDER BY metadata_id, question_id LIMIT 1"
+                "SELECT metadata_id, question_id FROM labeling_queue WHERE status = 'PENDING' "
+                "ORDER BY metadata_id, question_id LIMIT 1"
             )
             row = cur.fetchone()
             if not row:
@@ -193,6 +212,89 @@ class QueuesRepository(BaseDatabase):
             conn.commit()
             return {"metadata_id": metadata_id, "question_id": question_id}
 
+    def pop_next_labeling_jobs(self, limit: int) -> list[dict]:
+        """Claim tot 'limit' PENDING labeling jobs (status -> IN_FLIGHT) en verrijk ze direct.
+
+        Eén transactie: UPDATE ... RETURNING gecombineerd met een JOIN op questions en
+        metadata. De jobs blijven in de queue tot complete_labeling_jobs ze verwijdert;
+        na een crash zet requeue_stale_labeling_jobs ze terug naar PENDING.
+        Retourneert dicts met keys: metadata_id, question_id, label_id, prompt,
+        title, abstract (None als de question of metadata ontbreekt).
+        """
+        with self._connect() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                """
+                WITH claimed AS (
+                    UPDATE labeling_queue lq
+                    SET status = 'IN_FLIGHT', started_at = CURRENT_TIMESTAMP
+                    FROM (
+                        SELECT metadata_id, question_id
+                        FROM labeling_queue
+                        WHERE status = 'PENDING'
+                        ORDER BY metadata_id, question_id
+                        LIMIT %s
+                        FOR UPDATE SKIP LOCKED
+                    ) nxt
+                    WHERE lq.metadata_id = nxt.metadata_id AND lq.question_id = nxt.question_id
+                    RETURNING lq.metadata_id, lq.question_id
+                )
+                SELECT c.metadata_id, c.question_id, q.label_id, q.prompt, m.title, m.abstract
+                FROM claimed c
+                LEFT JOIN questions q ON q.id = c.question_id
+                LEFT JOIN metadata m ON m.id = c.metadata_id
+                ORDER BY c.metadata_id, c.question_id
+                """,
+                (int(limit),),
+            )
+            rows = cur.fetchall()
+            conn.commit()
+            return [dict(r) for r in rows]
+
+    def complete_labeling_jobs(
+        self,
+        labels: list[tuple[str, int, float | None]],
+        done_jobs: list[tuple[str, int]],
+    ) -> None:
+        """Checkpoint: schrijf labels weg en verwijder afgeronde jobs in één transactie.
+
+        labels: (metadata_id, label_id, confidence_score) voor positieve classificaties.
+        done_jobs: (metadata_id, question_id) van alle afgeronde jobs.
+        """
+        if not labels and not done_jobs:
+            return
+        with self._connect() as conn:
+            cur = conn.cursor()
+            if labels:
+                LabelsRepository._upsert_metadata_labels(cur, labels)
+            if done_jobs:
+                cur.execute(
+                    """
+                    DELETE FROM labeling_queue lq
+                    USING unnest(%s::text[], %s::int[]) AS d(metadata_id, question_id)
+                    WHERE lq.metadata_id = d.metadata_id AND lq.question_id = d.question_id
+                    """,
+                    ([mid for mid, _ in done_jobs], [qid for _, qid in done_jobs]),
+                )
+            conn.commit()
+
+    def requeue_stale_labeling_jobs(self, older_than_minutes: int) -> int:
+        """Zet IN_FLIGHT jobs ouder dan 'older_than_minutes' terug naar PENDING."""
+        with self._connect() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                """
+                UPDATE labeling_queue
+                SET status = 'PENDING', started_at = NULL
+                WHERE status = 'IN_FLIGHT'
+                  AND started_at < CURRENT_TIMESTAMP - make_interval(mins => %s)
+                """,
+                (int(older_than_minutes),),
+            )
+            requeued = cur.rowcount or 0
+            conn.commit()
+            return requeued
+
     def get_pending_downloads(self, limit: int) -> list[str]:
         """Haal tot 'limit' PENDING downloads op uit download_queue."""
         with self._connect() as conn:
@@ -226,3 +328,26 @@ class QueuesRepository(BaseDatabase):
                 (status, arxiv_id),
             )
             conn.commit()
+
+    def set_download_statuses(self, updates: list[tuple[str, str]]) -> None:
+        """Update download_status voor meerdere items in één transactie.
+
+        updates: lijst van (arxiv_id, status) tuples.
+        """
+        if not updates:
+            return
+        for _aid, status in updates:
+            if status not in ("PENDING", "COMPLETED", "FAILED"):
+                raise ValueError("status moet 'PENDING','COMPLETED' of 'FAILED' zijn")
+        with self._connect() as conn:
+            cur = conn.cursor()
+            cur.executemany(
+                """
+                UPDATE download_queue
+                SET download_status = %s,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE arxiv_id = %s
+                """,
+                [(status, aid) for aid, status in updates],
+            )
+            conn.commit()
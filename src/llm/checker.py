@@ -3,16 +3,67 @@ LLM Checker voor GitHub Copilot Metastudy
 Gebruikt Ollama voor binaire classificatie op basis van titel en abstract.
 """
 
+import asyncio
 from datetime import datetime
-import json
+import hashlib
 import logging
 from typing import Any, Dict, Optional, Tuple
 import re
 
-import ollama
+import orjson
 from src.llm.llm_clients import LLMClient
+from src.llm.result_cache import get_classification_cache
 
-from src.config import LLM_GENERAL_CONFIG, LLM_OLLAMA_CONFIG, LLM_VERTEX_CONFIG
+from src.config import (
+    LLM_GENERAL_CONFIG,
+    LLM_LLAMA_CPP_CONFIG,
+    LLM_OLLAMA_CONFIG,
+    LLM_VERTEX_CONFIG,
+)
+
+
+# Verhoog bij een wijziging in het parsen/interpreteren van antwoorden; de prompts zelf
+# tellen via hun hash al mee in de cachesleutel
+_PROMPT_VERSION = 1
+
+_SINGLE_SYSTEM_MSG = (
+    "You are an extremely strict and efficient binary classification agent. "
+    "Your task is to analyze the provided TEXT to answer the given QUESTION. "
+    "You **MUST** respond in strict JSON format. "
+    "No extra text, explanation, introduction, or markdown is allowed. "
+    'The JSON schema is: {"answer": true|false, "confidence": number}. '
+    "The 'confidence' must be a floating-point number between 0.00 and 1.00, "
+    "reflecting the certainty of your 'answer'. "
+    "**Respond directly and ONLY with the JSON output.**"
+)
+_SINGLE_USER_TEMPLATE = "QUESTION: {question}\n\nTITLE: {title}\n\nABSTRACT: {abstract}"
+
+_BATCH_SYSTEM_MSG = (
+    "You are an extremely strict and efficient binary classification agent. "
+    "Your task is to analyze each provided TEXT separately to answer the given QUESTION. "
+    "You **MUST** respond in strict JSON format. "
+    "No extra text, explanation, introduction, or markdown is allowed. "
+    'The JSON schema is: {"results": [{"id": string, "answer": true|false, '
+    '"confidence": number}, ...]} with exactly one result per TEXT id. '
+    "The 'confidence' must be a floating-point number between 0.00 and 1.00, "
+    "reflecting the certainty of your 'answer'. "
+    "**Respond directly and ONLY with the JSON output.**"
+)
+_BATCH_TEXT_TEMPLATE = "TEXT id={id}\nTITLE: {title}\nABSTRACT: {abstract}"
+_BATCH_USER_TEMPLATE = "QUESTION: {question}\n\n{texts}"
+
+
+def _prompt_id(*parts: str) -> str:
+    """Korte hash van prompt + templates + versie, voor in de resultaatcache-sleutel."""
+    h = hashlib.blake2b(str(_PROMPT_VERSION).encode(), digest_size=8)
+    for part in parts:
+        h.update(b"\x1f" + part.encode("utf-8"))
+    return h.hexdigest()
+
+
+# Enkel- en batchpad hebben elk een eigen prompt en dus een eigen cache-namespace
+_SINGLE_PROMPT_ID = _prompt_id(_SINGLE_SYSTEM_MSG, _SINGLE_USER_TEMPLATE)
+_BATCH_PROMPT_ID = _prompt_id(_BATCH_SYSTEM_MSG, _BATCH_TEXT_TEMPLATE, _BATCH_USER_TEMPLATE)
 
 
 class LLMChecker:
@@ -20,28 +71,31 @@ class LLMChecker:
         provider = str(LLM_GENERAL_CONFIG.get("provider", "ollama")).strip().lower()
         if provider == "vertex":
             self.model_name = LLM_VERTEX_CONFIG.get("model_name", "gemini-2.5-flash")
+        elif provider == "llama_cpp":
+            self.model_name = LLM_LLAMA_CPP_CONFIG.get("model_name", "llama_cpp")
         else:
             self.model_name = LLM_OLLAMA_CONFIG.get("model_name", "llama3:8b-instruct")
         self.logger = logging.getLogger(__name__)
         # Reuse a single AsyncClient instance voor gekozen provider
         provider = str(LLM_GENERAL_CONFIG.get("provider", "ollama")).strip().lower()
         self.async_client = llm_client
-        self.logger.info(f"LLM Checker initialized: provider={provider}, model={self.model_name}")
+        self._cache = get_classification_cache()
+        self.logger.info(
+            "LLM Checker initialized: provider=%s, model=%s", provider, self.model_name
+        )
 
     def _build_messages(self, question: str, title: str, abstract: str) -> list[dict]:
-        system_msg = (
-            "You are an extremely strict and efficient binary classification agent. "
-            "Your task is to analyze the provided TEXT to answer the given QUESTION. "
-            "You **MUST** respond in strict JSON format. "
-            "No extra text, explanation, introduction, or markdown is allowed. "
-            'The JSON schema is: {"answer": true|false, "confidence": number}. '
-            "The 'confidence' must be a floating-point number between 0.00 and 1.00, "
-            "reflecting the certainty of your 'answer'. "
-            "**Respond directly and ONLY with the JSON output.**"
-        )
-        user_msg = f"QUESTION: {question}\n\nTITLE: {title}\n\nABSTRACT: {abstract}"
+        user_msg = _SINGLE_USER_TEMPLATE.format(question=question, title=title, abstract=abstract)
+        return [
+            {"role": "system", "content": _SINGLE_SYSTEM_MSG},
+            {"role": "user", "content": user_msg},
+        ]
+
+    def _build_batch_messages(self, question: str, items: list[dict]) -> list[dict]:
+        texts = "\n\n".join(_BATCH_TEXT_TEMPLATE.format(**item) for item in items)
+        user_msg = _BATCH_USER_TEMPLATE.format(question=question, texts=texts)
         return [
-            {"role": "system", "content": system_msg},
+            {"role": "system", "content": _BATCH_SYSTEM_MSG},
             {"role": "user", "content": user_msg},
         ]
 
@@ -67,13 +121,34 @@ class LLMChecker:
         Retourneert (answer_bool|None, confidence|None) waarbij confidence in [0,1] is geschaald.
         """
         try:
-            obj = json.loads(text)
+            obj = orjson.loads(text)
             if isinstance(obj, dict):
                 ans_val = self._coerce_answer_bool(obj.get("answer"))
                 conf_val = self._coerce_confidence(obj.get("confidence"))
                 return ans_val, conf_val
         except Exception:
             return None, None
+        return None, None
+
+    def _parse_structured_batch(
+        self, text: str
+    ) -> Dict[str, Tuple[Optional[bool], Optional[float]]]:
+        """Parseer {"results": [{id, answer, confidence}, ...]} naar id -> (answer, confidence)."""
+        try:
+            obj = orjson.loads(text)
+        except Exception:
+            return {}
+        results = obj.get("results") if isinstance(obj, dict) else obj
+        parsed: Dict[str, Tuple[Optional[bool], Optional[float]]] = {}
+        if not isinstance(results, list):
+            return parsed
+        for entry in results:
+            if isinstance(entry, dict) and entry.get("id") is not None:
+                parsed[str(entry["id"])] = (
+                    self._coerce_answer_bool(entry.get("answer")),
+                    self._coerce_confidence(entry.get("confidence")),
+                )
+        return parsed
 
     def _coerce_answer_bool(self, value: Any) -> Optional[bool]:
         if isinstance(value, bool):
@@ -98,6 +173,13 @@ class LLMChecker:
         conf = max(0.0, min(1.0, conf))
         return conf
 
+    def _cache_key(
+        self, prompt_id: str, question: str, title: str, abstract: str
+    ) -> Optional[bytes]:
+        if self._cache is None or not (question and title and abstract):
+            return None
+        return self._cache.make_key(self.model_name, prompt_id, question, title, abstract)
+
     def _default_structured(self) -> Dict[str, object]:
         return {"answer_value": None, "confidence_score": None}
 
@@ -115,6 +197,12 @@ class LLMChecker:
             result["answer_value"] = False
             return result
 
+        cache_key = self._cache_key(_SINGLE_PROMPT_ID, question, title, abstract)
+        cached = self._cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            result["answer_value"], result["confidence_score"] = cached
+            return result
+
         try:
             messages = self._build_messages(question=question, title=title, abstract=abstract)
             content = await self._chat_async(messages)
@@ -123,6 +211,8 @@ class LLMChecker:
             if ans is None:
                 self.logger.warning("Unclear LLM response (async); defaulting answer to False")
                 ans = False
+            elif cache_key:
+                self._cache.put(cache_key, ans, conf)
             result["answer_value"] = bool(ans)
             result["confidence_score"] = conf
             return result
@@ -130,3 +220,71 @@ class LLMChecker:
             self.logger.error("LLM async classification failed: %s", exc)
             result["answer_value"] = False
             return result
+
+    async def classify_title_abstract_batch_async(
+        self, question: str, items: list[dict]
+    ) -> list[Dict[str, object]]:
+        """Classificeer meerdere {id, title, abstract} items met één LLM-aanroep.
+
+        Retourneert per item (in dezelfde volgorde) een structured result. Items uit de
+        resultaatcache gaan niet naar het model; items die in het antwoord ontbreken of
+        onleesbaar zijn, worden alsnog los geclassificeerd.
+        """
+        results: list[Optional[Dict[str, object]]] = [None] * len(items)
+        keys: list[Optional[bytes]] = []
+        uncached: list[int] = []
+        for idx, item in enumerate(items):
+            key = self._cache_key(_BATCH_PROMPT_ID, question, item["title"], item["abstract"])
+            keys.append(key)
+            cached = self._cache.get(key) if key else None
+            if cached is None:
+                uncached.append(idx)
+            else:
+                results[idx] = {"answer_value": cached[0], "confidence_score": cached[1]}
+
+        if len(uncached) <= 1:
+            for idx in uncached:
+                results[idx] = await self.classify_title_abstract_structured_async(
+                    question=question, title=items[idx]["title"], abstract=items[idx]["abstract"]
+                )
+            return results
+
+        parsed: Dict[str, Tuple[Optional[bool], Optional[float]]] = {}
+        try:
+            messages = self._build_batch_messages(
+                question=question, items=[items[idx] for idx in uncached]
+            )
+            content = await self._chat_async(messages)
+            parsed = self._parse_structured_batch(self._strip_code_fences(content))
+        except Exception as exc:
+            self.logger.error("LLM async batch classification failed: %s", exc)
+
+        missing: list[int] = []
+        for idx in uncached:
+            ans, conf = parsed.get(str(items[idx]["id"]), (None, None))
+            if ans is None:
+                missing.append(idx)
+                continue
+            if keys[idx]:
+                self._cache.put(keys[idx], ans, conf)
+            results[idx] = {"answer_value": bool(ans), "confidence_score": conf}
+
+        if missing:
+            self.logger.warning(
+                "Batch-antwoord mist %s van %s items; terugval naar losse classificatie",
+                len(missing),
+                len(uncached),
+            )
+            fallback = await asyncio.gather(
+                *(
+                    self.classify_title_abstract_structured_async(
+                        question=question,
+                        title=items[idx]["title"],
+                        abstract=items[idx]["abstract"],
+                    )
+                    for idx in missing
+                )
+            )
+            for idx, res in zip(missing, fallback):
+                results[idx] = res
+        return results
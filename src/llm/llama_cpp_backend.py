@@ -0,0 +1,132 @@
+"""
+llama.cpp backend voor de LLM-client
+Laadt één GGUF-model per proces en serialiseert inferentie; max_tokens past binnen n_ctx.
+"""
+
+import asyncio
+import threading
+from typing import Any, Optional
+
+from src.config import LLM_LLAMA_CPP_CONFIG
+
+# Eén Llama-instantie per proces: het laden van het GGUF-model (warmup) gebeurt maar één keer
+_llm: Optional[Any] = None
+_load_lock = threading.Lock()
+# Een llama.cpp context is niet thread-safe; inferentie wordt per instantie geserialiseerd
+_inference_lock = threading.Lock()
+
+
+def get_llama_cpp_model() -> Any:
+    """Laad (lazy) het gedeelde llama.cpp model; llama-cpp-python is een optionele dependency."""
+    global _llm
+    if _llm is not None:
+        return _llm
+    with _load_lock:
+        if _llm is None:
+            try:
+                from llama_cpp import Llama
+            except ImportError as e:
+                raise RuntimeError(
+                    "llama-cpp-python is niet geïnstalleerd (pip install llama-cpp-python)"
+                ) from e
+            _llm = Llama(
+                model_path=LLM_LLAMA_CPP_CONFIG["model_path"],
+                n_ctx=int(LLM_LLAMA_CPP_CONFIG.get("n_ctx", 8192)),
+                n_batch=int(LLM_LLAMA_CPP_CONFIG.get("n_batch", 512)),
+                n_threads=LLM_LLAMA_CPP_CONFIG.get("n_threads"),
+                n_gpu_layers=int(LLM_LLAMA_CPP_CONFIG.get("n_gpu_layers", -1)),
+                verbose=False,
+            )
+    return _llm
+
+
+# Marge voor afrondingsverschillen bij het tellen van de prompt (o.a. een dubbele BOS)
+_CONTEXT_MARGIN_TOKENS = 64
+
+
+def _chat_prompt(llm: Any, messages: list[dict]) -> str:
+    """Render de berichten zoals create_chat_completion ze aan het model geeft.
+
+    Gebruikt het chat-template uit de GGUF-metadata; zonder template (of bij een oudere
+    llama-cpp-python) worden rolmarkeringen per bericht benaderd.
+    """
+    template = (getattr(llm, "metadata", None) or {}).get("tokenizer.chat_template")
+    if template:
+        try:
+            from llama_cpp.llama_chat_format import Jinja2ChatFormatter
+
+            def token_text(token: int) -> str:
+                return llm.detokenize([token]).decode("utf-8", errors="ignore")
+
+            formatter = Jinja2ChatFormatter(
+                template=template,
+                eos_token=token_text(llm.token_eos()),
+                bos_token=token_text(llm.token_bos()),
+                add_generation_prompt=True,
+            )
+            return formatter(messages=messages).prompt
+        except Exception:
+            # Template niet te renderen: val terug op de benadering hieronder
+            pass
+    parts = [f"<|{m.get('role')}|>\n{m.get('content') or ''}\n" for m in messages]
+    return "".join(parts) + "<|assistant|>\n"
+
+
+def _fit_max_tokens(llm: Any, prompt: str, max_tokens: Optional[int]) -> int:
+    """Begrens max_tokens tot wat na de prompt nog in n_ctx past.
+
+    Prompt + output mogen samen niet groter zijn dan de context; anders faalt llama.cpp of
+    wordt de output afgekapt. Het aantal prompt-tokens komt van de tokenizer van het model.
+    """
+    requested = int(max_tokens or LLM_LLAMA_CPP_CONFIG.get("max_tokens", 4096))
+    n_ctx = int(LLM_LLAMA_CPP_CONFIG.get("n_ctx", 8192))
+    prompt_tokens = len(llm.tokenize(prompt.encode("utf-8"), add_bos=True))
+    available = n_ctx - prompt_tokens - _CONTEXT_MARGIN_TOKENS
+    if available < 1:
+        raise ValueError(
+            f"Prompt ({prompt_tokens} tokens) past niet in n_ctx={n_ctx}; verklein de invoer"
+        )
+    return min(requested, available)
+
+
+def _sampling_options(max_tokens: int) -> dict:
+    return {
+        "temperature": LLM_LLAMA_CPP_CONFIG.get("temperature", 0.1),
+        "top_p": LLM_LLAMA_CPP_CONFIG.get("top_p", 0.9),
+        "top_k": LLM_LLAMA_CPP_CONFIG.get("top_k", 40),
+        "max_tokens": max_tokens,
+    }
+
+
+def _run_locked(fn, *args, **kwargs) -> Any:
+    with _inference_lock:
+        return fn(*args, **kwargs)
+
+
+class LlamaCppChatStrategy:
+    def __init__(self, llm: Any) -> None:
+        self._llm = llm
+
+    async def chat(self, messages: list[dict]) -> dict:
+        prompt = _chat_prompt(self._llm, messages)
+        kwargs = _sampling_options(_fit_max_tokens(self._llm, prompt, None))
+        if LLM_LLAMA_CPP_CONFIG.get("format") == "json":
+            kwargs["response_format"] = {"type": "json_object"}
+        # llama.cpp geeft de GIL vrij in C; in een thread blijft de event loop responsief
+        response = await asyncio.to_thread(
+            _run_locked, self._llm.create_chat_completion, messages=messages, **kwargs
+        )
+        content = response["choices"][0]["message"].get("content") or ""
+        return {"message": {"content": content}}
+
+
+class LlamaCppGenerateStrategy:
+    def __init__(self, llm: Any) -> None:
+        self._llm = llm
+
+    async def generate(self, prompt: str, max_tokens: Optional[int] = None) -> dict:
+        options = _sampling_options(_fit_max_tokens(self._llm, prompt, max_tokens))
+        response = await asyncio.to_thread(
+            _run_locked, self._llm.create_completion, prompt, **options
+        )
+        return {"message": {"content": response["choices"][0].get("text") or ""}}
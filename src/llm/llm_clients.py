@@ -1,7 +1,20 @@
 from typing import Optional, Any, Callable, Awaitable
 import asyncio
-
-from src.config import LLM_GENERAL_CONFIG, LLM_OLLAMA_CONFIG, LLM_VERTEX_CONFIG
+import threading
+import time
+import weakref
+
+from src.config import (
+    LLM_GENERAL_CONFIG,
+    LLM_LLAMA_CPP_CONFIG,
+    LLM_OLLAMA_CONFIG,
+    LLM_VERTEX_CONFIG,
+)
+from src.llm.llama_cpp_backend import (
+    get_llama_cpp_model,
+    LlamaCppChatStrategy,
+    LlamaCppGenerateStrategy,
+)
 from src.llm.ollama import get_ollama_async_client, OllamaChatStrategy, OllamaGenerateStrategy
 from src.llm.vertex import get_vertex_genai_sync_client, VertexChatStrategy, VertexGenerateStrategy
 
@@ -17,6 +30,7 @@ class LLMClient:
         self._chat_strategy: Optional[Any] = None
         self._generate_strategy: Optional[Any] = None
         self._semaphore: Optional[asyncio.Semaphore] = None
+        self._rate_limiter: Optional["_RateLimiter"] = None
 
     async def __aenter__(self) -> "LLMClient":
         """Initialiseert de client en strategie asynchroon. Zorgt voor robuuste client creatie."""
@@ -29,10 +43,27 @@ class LLMClient:
                 self._chat_strategy = VertexChatStrategy(self._client.aio)
                 self._generate_strategy = VertexGenerateStrategy(self._client.aio)
                 self._semaphore = _GlobalSemaphoreRegistry.get_semaphore(self._provider, int(LLM_VERTEX_CONFIG.get("batch_size", 2)))
+                self._rate_limiter = _RateLimiter.for_provider(
+                    self._provider,
+                    LLM_VERTEX_CONFIG.get("requests_per_minute"),
+                    LLM_VERTEX_CONFIG.get("tokens_per_minute"),
+                )
             except Exception as e:
                 # Vang fouten op bij client creatie (bijv. config fouten)
                 raise RuntimeError(f"Vertex AI Client kon niet worden geïnitialiseerd: {e}")
 
+        elif self._provider == "llama_cpp":
+            try:
+                # Gedeeld in-process model; geen client om te sluiten in __aexit__
+                llm = get_llama_cpp_model()
+                self._chat_strategy = LlamaCppChatStrategy(llm)
+                self._generate_strategy = LlamaCppGenerateStrategy(llm)
+                self._semaphore = _GlobalSemaphoreRegistry.get_semaphore(
+                    self._provider, int(LLM_LLAMA_CPP_CONFIG.get("batch_size", 1))
+                )
+            except Exception as e:
+                raise RuntimeError(f"llama.cpp model kon niet worden geladen: {e}")
+
         else:  # ollama
             try:
                 self._client = get_ollama_async_client()
@@ -70,37 +101,146 @@ class LLMClient:
             raise RuntimeError(
                 "LLMClient moet worden gebruikt met 'async with' om te initialiseren"
             )
-        return await self._run_with_limit(lambda: self._chat_strategy.chat(messages))
+        est_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4
+        return await self._run_with_limit(
+            lambda: self._chat_strategy.chat(messages), est_tokens=est_tokens
+        )
+
+    async def generate(self, prompt: str, max_tokens: Optional[int] = None) -> dict:
+        """Voert de generate-aanroep uit via de geselecteerde strategie (prompt-only).
 
-    async def generate(self, prompt: str) -> dict:
-        """Voert de generate-aanroep uit via de geselecteerde strategie (prompt-only)."""
+        max_tokens overschrijft optioneel het geconfigureerde output-budget voor dit request.
+        """
         if not hasattr(self, "_generate_strategy") or self._generate_strategy is None:
             raise RuntimeError(
                 "LLMClient moet worden gebruikt met 'async with' om te initialiseren"
             )
-        return await self._run_with_limit(lambda: self._generate_strategy.generate(prompt))
+        return await self._run_with_limit(
+            lambda: self._generate_strategy.generate(prompt, max_tokens=max_tokens),
+            est_tokens=len(prompt) // 4,
+        )
 
-    async def _run_with_limit(self, call: Callable[[], Awaitable[Any]]) -> Any:
+    async def _run_with_limit(
+        self, call: Callable[[], Awaitable[Any]], est_tokens: int = 0
+    ) -> Any:
         if self._semaphore is None:
-            return await call()
+            return await self._call_rate_limited(call, est_tokens)
         await self._semaphore.acquire()
         try:
-            return await call()
+            return await self._call_rate_limited(call, est_tokens)
         finally:
             self._semaphore.release()
 
+    async def _call_rate_limited(self, call: Callable[[], Awaitable[Any]], est_tokens: int) -> Any:
+        if self._rate_limiter is None:
+            return await call()
+        await self._rate_limiter.acquire(est_tokens)
+        try:
+            return await call()
+        except Exception as e:
+            # 429: de provider geeft aan dat we te snel gaan; rem alle volgende requests af
+            if getattr(e, "code", None) == 429 or getattr(e, "status_code", None) == 429:
+                self._rate_limiter.pause(_retry_after_seconds(e))
+            raise
+
 
 class _GlobalSemaphoreRegistry:
-    # key: (provider, loop_id) -> semaphore
-    _semaphores: dict[tuple[str, int], asyncio.Semaphore] = {}
+    """Eén semaphore per (provider, event loop), gedeeld door alle LLMClient instanties.
+
+    De capaciteit wordt naast de semaphore bewaard; vergelijken met ``_value`` is onjuist
+    omdat die daalt zodra taken de semaphore bezetten. Houd de capaciteit voor Ollama gelijk
+    aan ``OLLAMA_NUM_PARALLEL`` om head-of-line blocking in de Ollama-queue te voorkomen.
+    """
+
+    # loop -> {provider: (capacity, semaphore)}; weak keys zodat gesloten loops verdwijnen
+    _semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = (
+        weakref.WeakKeyDictionary()
+    )
+    _lock = threading.Lock()
 
     @classmethod
     def get_semaphore(cls, provider: str, capacity: int) -> asyncio.Semaphore:
         loop = asyncio.get_running_loop()
-        key = (provider, id(loop))
-        sem = cls._semaphores.get(key)
-        if sem is None or (hasattr(sem, "_value") and sem._value != capacity):  # type: ignore[attr-defined]
-            cls._semaphores[key] = asyncio.Semaphore(int(max(1, capacity)))
-        return cls._semaphores[key]
+        capacity = int(max(1, capacity))
+        with cls._lock:
+            per_loop = cls._semaphores.setdefault(loop, {})
+            entry = per_loop.get(provider)
+            if entry is None or entry[0] != capacity:
+                entry = (capacity, asyncio.Semaphore(capacity))
+                per_loop[provider] = entry
+            return entry[1]
+
+
+def _retry_after_seconds(error: Exception, default: float = 5.0) -> float:
+    """Lees Retry-After uit de response van een 429-fout, indien aanwezig."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return max(0.0, float(headers.get("retry-after") or headers.get("Retry-After")))
+    except (TypeError, ValueError):
+        return default
+
+
+class _TokenBucket:
+    """Token bucket die per minuut ``rate_per_minute`` eenheden bijvult.
+
+    ``reserve`` boekt direct af (het saldo mag negatief worden) en geeft terug hoe lang de
+    aanroeper moet wachten; zo is er geen achtergrondtaak of loop-gebonden lock nodig.
+    """
+
+    def __init__(self, rate_per_minute: float) -> None:
+        self.capacity = float(rate_per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float, now: float) -> float:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= min(float(amount), self.capacity)
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class _RateLimiter:
+    """Proactieve RPM/TPM-begrenzing per provider, gedeeld binnen het proces.
+
+    Aanvulling op de semaphore (die alleen gelijktijdigheid begrenst): requests worden
+    vooraf gespreid zodat de provider-quota niet tot 429's en backoff leiden.
+    """
+
+    _instances: dict[tuple, "_RateLimiter"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, rpm: Optional[float], tpm: Optional[float]) -> None:
+        self._requests = _TokenBucket(rpm) if rpm else None
+        self._tokens = _TokenBucket(tpm) if tpm else None
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
 
- 
+    @classmethod
+    def for_provider(
+        cls, provider: str, rpm: Optional[float], tpm: Optional[float]
+    ) -> Optional["_RateLimiter"]:
+        if not rpm and not tpm:
+            return None
+        key = (provider, rpm, tpm)
+        with cls._instances_lock:
+            limiter = cls._instances.get(key)
+            if limiter is None:
+                limiter = cls._instances[key] = cls(rpm, tpm)
+            return limiter
+
+    async def acquire(self, est_tokens: int = 0) -> None:
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self._blocked_until - now)
+            if self._requests is not None:
+                wait = max(wait, self._requests.reserve(1, now))
+            if self._tokens is not None and est_tokens > 0:
+                wait = max(wait, self._tokens.reserve(est_tokens, now))
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
@@ -1,12 +1,29 @@
 import asyncio
 import logging
-from typing import List, Iterator
-from src.config import LLM_GENERAL_CONFIG, LLM_OLLAMA_CONFIG, LLM_VERTEX_CONFIG
+import os
+import re
+import threading
+from bisect import bisect_right
+from typing import List, Iterator, Optional
+from src.config import (
+    LLM_GENERAL_CONFIG,
+    LLM_LLAMA_CPP_CONFIG,
+    LLM_OLLAMA_CONFIG,
+    LLM_VERTEX_CONFIG,
+)
 
 from src.llm.llm_clients import LLMClient
 
 logger = logging.getLogger(__name__)
 
+# Paragraafgrenzen (overlappend, zoals str.rfind ze zou vinden)
+_PARAGRAPH_BREAK_RE = re.compile(r"(?=\n\n)")
+
+# Synchrone aanroepen (bv. vanuit de TeX-threadpool) krijgen elk een eigen event loop en dus
+# een eigen provider-semaphore; één fallback tegelijk per proces houdt de batch_size-limiet
+# van de provider ook dan procesbreed
+_SYNC_FALLBACK_SLOT = threading.BoundedSemaphore(1)
+
 
 SYSTEM_INSTRUCTIONS = (
     "You are an expert converter of complex, potentially broken, scientific LaTeX documents into clean, correct Markdown. Your single highest priority is to ensure **ABSOLUTELY ALL TEXTUAL CONTENT IS RETAINED**.\n"
@@ -23,46 +40,191 @@ SYSTEM_INSTRUCTIONS = (
 )
 
 
+# Vaste prompt-prefix; één keer opgebouwd i.p.v. per chunk opnieuw geconcateneerd
+_SYSTEM_PREFIX = SYSTEM_INSTRUCTIONS + "\n\n"
+
+CHUNK_BREAK = "<<<CHUNK_BREAK>>>"
+
+BATCH_INSTRUCTIONS = (
+    "The input below contains {count} independent LaTeX segments separated by the delimiter "
+    f"{CHUNK_BREAK}. Convert each segment separately following the rules above and return "
+    f"exactly {{count}} Markdown outputs, in the same order, separated by the delimiter "
+    f"{CHUNK_BREAK} on its own line.\n"
+)
+
+
 def _chunk_text(text: str, max_chars: int) -> Iterator[str]:
     if len(text) <= max_chars:
         yield text
         return
+    # Bepaal alle paragraafgrenzen in één pass; per chunk volstaat dan een bisect
+    offsets = [m.start() for m in _PARAGRAPH_BREAK_RE.finditer(text)]
     start = 0
     while start < len(text):
         end = min(start + max_chars, len(text))
-        # Probeer netjes op een paragraafgrens te knippen
-        cut = text.rfind("\n\n", start, end)
+        # Probeer netjes op een paragraafgrens te knippen (laatste "\n\n" volledig vóór end)
+        idx = bisect_right(offsets, end - 2) - 1
+        cut = offsets[idx] if idx >= 0 and offsets[idx] >= start else -1
         if cut == -1 or cut <= start + int(max_chars * 0.85):
             cut = end
         yield text[start:cut]
         start = cut
 
 
-async def build_markdown_from_latex_async(latex: str, *, max_chars_per_chunk: int = 20000) -> str:
+def _group_chunks(
+    chunks: List[str], max_per_group: int, max_chars: int, max_output_tokens: int
+) -> List[List[str]]:
+    """Groepeer opeenvolgende chunks zodat meerdere chunks in één request passen.
+
+    Een groep wordt ook gesloten zodra de geschatte output van alle chunks samen niet meer
+    binnen max_output_tokens past; anders wordt het antwoord afgekapt en volgt toch een
+    terugval naar losse requests.
+    """
+    groups: List[List[str]] = []
+    current: List[str] = []
+    current_chars = 0
+    for chunk in chunks:
+        total = current_chars + len(chunk)
+        if current and (
+            len(current) >= max_per_group
+            or total > max_chars
+            or _estimated_output_tokens(total) > max_output_tokens
+        ):
+            groups.append(current)
+            current, current_chars = [], 0
+        current.append(chunk)
+        current_chars += len(chunk)
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _output_cap() -> int:
+    """Max-output-instelling (tokens) van de actieve provider in de config."""
+    provider = str(LLM_GENERAL_CONFIG.get("provider", "ollama")).strip().lower()
+    if provider == "vertex":
+        return int(LLM_VERTEX_CONFIG.get("max_output_tokens") or 4096)
+    if provider == "llama_cpp":
+        return int(LLM_LLAMA_CPP_CONFIG.get("max_tokens") or 4096)
+    return int(LLM_OLLAMA_CONFIG.get("num_predict") or 4096)
+
+
+def _estimated_output_tokens(input_chars: int) -> int:
+    # ~3 tekens per token, 30% marge
+    return int(input_chars / 3 * 1.3)
+
+
+def _output_budget(input_chars: int) -> int:
+    """Schat het benodigde aantal output-tokens, begrensd door de provider-instelling."""
+    return min(_output_cap(), max(256, _estimated_output_tokens(input_chars)))
+
+
+def _content(resp: dict) -> str:
+    return ((resp or {}).get("message", {}).get("content", "")).strip()
+
+
+async def _generate_chunk(client: LLMClient, chunk: str) -> str:
+    return _content(
+        await client.generate(_SYSTEM_PREFIX + chunk, max_tokens=_output_budget(len(chunk)))
+    )
+
+
+async def _generate_group(client: LLMClient, group: List[str]) -> List[str]:
+    """Converteer een groep chunks; bij meerdere chunks in één request met delimiter."""
+    if len(group) == 1:
+        return [await _generate_chunk(client, group[0])]
+    prompt = (
+        f"{SYSTEM_INSTRUCTIONS}{BATCH_INSTRUCTIONS.format(count=len(group))}\n"
+        + f"\n{CHUNK_BREAK}\n".join(group)
+    )
+    budget = _output_budget(sum(len(chunk) for chunk in group))
+    outputs = _content(await client.generate(prompt, max_tokens=budget)).split(CHUNK_BREAK)
+    if len(outputs) == len(group):
+        return [o.strip() for o in outputs]
+    logger.warning(
+        "Batch-output bevat %s i.p.v. %s delen; terugval naar losse requests",
+        len(outputs),
+        len(group),
+    )
+    return list(await asyncio.gather(*(_generate_chunk(client, chunk) for chunk in group)))
+
+
+async def build_markdown_from_latex_async(
+    latex: str, *, max_chars_per_chunk: int = 20000, output_path: Optional[str] = None
+) -> str:
     # Bepaal provider-specifieke chunkgrootte uit config indien niet expliciet overschreven
     provider = str(LLM_GENERAL_CONFIG.get("provider", "ollama")).strip().lower()
     if provider == "vertex":
         cfg_val = LLM_VERTEX_CONFIG.get("max_chars_per_chunk")
+    elif provider == "llama_cpp":
+        cfg_val = LLM_LLAMA_CPP_CONFIG.get("max_chars_per_chunk")
     else:
         cfg_val = LLM_OLLAMA_CONFIG.get("max_chars_per_chunk")
     if isinstance(cfg_val, int) and cfg_val > 0:
         max_chars_per_chunk = cfg_val
-    async with LLMClient() as client:
-        tasks = [
-            client.generate(f"{SYSTEM_INSTRUCTIONS}\n\n{chunk}")
-            for chunk in _chunk_text(latex, max_chars_per_chunk)
-        ]
-        responses = await asyncio.gather(*tasks)
+    chunks = list(_chunk_text(latex, max_chars_per_chunk))
+    if provider == "vertex":
+        # Gemini accepteert meerdere segmenten per request: minder request-overhead
+        groups = _group_chunks(
+            chunks,
+            int(LLM_VERTEX_CONFIG.get("chunks_per_request", 1)),
+            int(LLM_VERTEX_CONFIG.get("max_chars_per_request", max_chars_per_chunk)),
+            _output_cap(),
+        )
+    else:
+        groups = [[chunk] for chunk in chunks]
 
-    parts: List[str] = []
-    for resp in responses:
-        content = (resp or {}).get("message", {}).get("content", "")
-        parts.append(content.strip())
-    return "\n\n".join(p for p in parts if p)
+    # Schrijf naar een tijdelijk bestand; pas bij succes wordt output_path geplaatst
+    part_path = f"{output_path}.part" if output_path else None
+    out = open(part_path, "w", encoding="utf-8") if part_path else None
+    try:
+        async with LLMClient() as client:
 
+            async def _generate(idx: int, group: List[str]) -> tuple[int, List[str]]:
+                return idx, await _generate_group(client, group)
 
-def build_markdown_from_latex(latex: str, *, max_chars_per_chunk: int = 20000) -> str:
+            tasks = [asyncio.create_task(_generate(i, group)) for i, group in enumerate(groups)]
+            results: List[Optional[List[str]]] = [None] * len(tasks)
+            written = 0
+            wrote_any = False
+            try:
+                # Verwerk resultaten zodra ze binnenkomen; schrijf het aaneengesloten
+                # gereedstaande prefix direct weg i.p.v. op de laatste chunk te wachten.
+                for fut in asyncio.as_completed(tasks):
+                    idx, group_parts = await fut
+                    results[idx] = group_parts
+                    while written < len(results) and results[written] is not None:
+                        if out is not None:
+                            for part in filter(None, results[written]):
+                                if wrote_any:
+                                    out.write("\n\n")
+                                out.write(part)
+                                wrote_any = True
+                        written += 1
+            except BaseException:
+                # Fail fast: annuleer resterende chunks zodra er één faalt
+                for t in tasks:
+                    t.cancel()
+                raise
+    except BaseException:
+        if out is not None:
+            out.close()
+            os.remove(part_path)
+        raise
+    if out is not None:
+        out.close()
+        os.replace(part_path, output_path)
+
+    return "\n\n".join(p for group_parts in results for p in group_parts if p)
+
+
+def build_markdown_from_latex(
+    latex: str, *, max_chars_per_chunk: int = 20000, output_path: Optional[str] = None
+) -> str:
     # Laat async variant provider-config lezen; geef eventueel een override mee
-    return asyncio.run(
-        build_markdown_from_latex_async(latex, max_chars_per_chunk=max_chars_per_chunk)
-    )
+    with _SYNC_FALLBACK_SLOT:
+        return asyncio.run(
+            build_markdown_from_latex_async(
+                latex, max_chars_per_chunk=max_chars_per_chunk, output_path=output_path
+            )
+        )
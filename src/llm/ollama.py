@@ -1,3 +1,4 @@
+import io
 from typing import Optional
 import ollama
 
@@ -40,7 +41,24 @@ class OllamaGenerateStrategy:
             "top_k": LLM_OLLAMA_CONFIG.get("top_k"),
         }
 
-    async def generate(self, prompt: str) -> dict:
-        resp = await self._client.generate(model=self.model, prompt=prompt, options=self.options)
-        text = (resp or {}).get("response") or (resp or {}).get("message") or ""
-        return {"message": {"content": str(text)}}
+    async def generate(self, prompt: str, max_tokens: Optional[int] = None) -> dict:
+        options = self.options
+        if max_tokens is not None:
+            options = {**self.options, "num_predict": int(max_tokens)}
+        # Stream de generatie zodat we niet op de volledige body wachten en kunnen afbreken
+        # zodra de output onrealistisch lang wordt (runaway generatie).
+        max_chars = 2 * len(prompt)
+        buffer = io.StringIO()
+        stream = await self._client.generate(
+            model=self.model, prompt=prompt, options=options, stream=True
+        )
+        try:
+            async for part in stream:
+                buffer.write((part or {}).get("response") or "")
+                if buffer.tell() > max_chars:
+                    raise RuntimeError(
+                        f"Ollama output overschrijdt {max_chars} tekens; generatie afgebroken"
+                    )
+        finally:
+            await stream.aclose()
+        return {"message": {"content": buffer.getvalue()}}
@@ -0,0 +1,89 @@
+"""
+Persistente cache voor LLM-classificaties
+Sleutel: hash van (model, prompt-id, vraag, titel, abstract); waarde: (answer, confidence).
+"""
+
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Tuple
+
+from src.config import LLM_GENERAL_CONFIG, PROJECT_ROOT
+
+CachedResult = Tuple[bool, Optional[float]]
+
+
+class ClassificationCache:
+    """SQLite-bestand op schijf met een kleine in-process LRU-laag ervoor.
+
+    Herhaalde runs (of een herstart na een crash) krijgen identieke invoer zo uit de cache
+    i.p.v. opnieuw van het model. Alleen eenduidige antwoorden worden opgeslagen.
+    """
+
+    def __init__(self, path: Path, memory_items: int = 4096) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key BLOB PRIMARY KEY, answer INTEGER NOT NULL, confidence REAL)"
+        )
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[bytes, CachedResult]" = OrderedDict()
+        self._memory_items = max(0, int(memory_items))
+
+    @staticmethod
+    def make_key(model: str, prompt_id: str, question: str, title: str, abstract: str) -> bytes:
+        """prompt_id identificeert systeemprompt + template; andere prompt = nieuwe sleutels."""
+        h = hashlib.blake2b(digest_size=16)
+        for part in (model, prompt_id, question, title, abstract):
+            h.update(part.encode("utf-8"))
+            h.update(b"\x1f")
+        return h.digest()
+
+    def get(self, key: bytes) -> Optional[CachedResult]:
+        with self._lock:
+            hit = self._memory.get(key)
+            if hit is not None:
+                self._memory.move_to_end(key)
+                return hit
+            row = self._conn.execute(
+                "SELECT answer, confidence FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            result = (bool(row[0]), row[1])
+            self._remember(key, result)
+            return result
+
+    def put(self, key: bytes, answer: bool, confidence: Optional[float]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, answer, confidence) VALUES (?, ?, ?)",
+                (key, int(bool(answer)), confidence),
+            )
+            self._remember(key, (bool(answer), confidence))
+
+    def _remember(self, key: bytes, result: CachedResult) -> None:
+        if not self._memory_items:
+            return
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        if len(self._memory) > self._memory_items:
+            self._memory.popitem(last=False)
+
+
+@lru_cache(maxsize=1)
+def get_classification_cache() -> Optional[ClassificationCache]:
+    """Gedeelde cache per proces; None als LLM_GENERAL_CONFIG['result_cache_path'] leeg is."""
+    cache_path = LLM_GENERAL_CONFIG.get("result_cache_path")
+    if not cache_path:
+        return None
+    path = Path(cache_path)
+    if not path.is_absolute():
+        path = PROJECT_ROOT / path
+    return ClassificationCache(path)
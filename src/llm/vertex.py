@@ -1,79 +1,166 @@
-from typing import Any
+from functools import lru_cache
+from typing import Any, Optional
+import google.auth
+import httpx
+from google.auth.credentials import Credentials
 from google.genai import Client as VertexClient
 from google.genai import types as genai_types
 
 from src.config import LLM_VERTEX_CONFIG
 
 
+def _build_async_transport() -> httpx.AsyncHTTPTransport:
+    """HTTP/2 transport met keep-alive pool: alle chunks delen één gemultiplexte verbinding."""
+    max_connections = int(LLM_VERTEX_CONFIG.get("max_connections", 32))
+    return httpx.AsyncHTTPTransport(
+        http2=bool(LLM_VERTEX_CONFIG.get("http2", True)),
+        retries=2,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max(1, max_connections // 2),
+        ),
+    )
+
+
+@lru_cache(maxsize=4)
+def _adc_credentials(project: str) -> Credentials:
+    """ADC-credentials één keer per project laden; de token wordt alleen ververst als hij verloopt.
+
+    De client zelf wordt niet gecachet: ``LLMClient.__aexit__`` sluit de async transport en
+    die is gebonden aan de event loop waarin hij is gebruikt.
+    """
+    credentials, _ = google.auth.default(
+        scopes=["https://www.googleapis.com/auth/cloud-platform"]
+    )
+    return credentials
+
+
+# (temperature, top_p, top_k, max_output_tokens) -> gedeelde config; niet muteren
+_GENERATE_CONFIGS: dict[tuple, genai_types.GenerateContentConfig] = {}
+
+
+def _generate_content_config() -> genai_types.GenerateContentConfig:
+    key = (
+        LLM_VERTEX_CONFIG.get("temperature"),
+        LLM_VERTEX_CONFIG.get("top_p"),
+        LLM_VERTEX_CONFIG.get("top_k"),
+        LLM_VERTEX_CONFIG.get("max_output_tokens"),
+    )
+    config = _GENERATE_CONFIGS.get(key)
+    if config is None:
+        temperature, top_p, top_k, max_output_tokens = key
+        config = _GENERATE_CONFIGS.setdefault(
+            key,
+            genai_types.GenerateContentConfig(
+                temperature=temperature,
+                top_p=top_p,
+                top_k=top_k,
+                max_output_tokens=max_output_tokens,
+            ),
+        )
+    return config
+
+
 def get_vertex_genai_sync_client() -> VertexClient:
     project_id = LLM_VERTEX_CONFIG.get("project", "bennekers")
     location = LLM_VERTEX_CONFIG.get("location", "europe-west4")
     api_version = LLM_VERTEX_CONFIG.get("api_version")
-    http_options = genai_types.HttpOptions(api_version=api_version) if api_version else None
-    client_kwargs = {"vertexai": True, "project": project_id, "location": location}
-    if http_options is not None:
-        client_kwargs["http_options"] = http_options
+    # Een expliciete transport laat de SDK httpx (i.p.v. aiohttp) gebruiken voor .aio
+    http_options = genai_types.HttpOptions(
+        api_version=api_version,
+        headers={"Accept-Encoding": "br, gzip"},
+        async_client_args={"transport": _build_async_transport()},
+    )
+    client_kwargs = {
+        "vertexai": True,
+        "project": project_id,
+        "location": location,
+        "credentials": _adc_credentials(project_id),
+        "http_options": http_options,
+    }
     return VertexClient(**client_kwargs)
 
 
+@lru_cache(maxsize=64)
+def _system_prefix(system_instructions: tuple[str, ...]) -> str:
+    """Samengevoegde system-instructies; constant over alle requests van een run."""
+    return "\n\n".join(system_instructions) + "\n\n"
+
+
+def _extract_text(response: Any) -> str:
+    """Tekst uit een generate_content response.
+
+    Snelle route voor de gangbare vorm (één kandidaat met één tekst-part); anders via de
+    ``response.text`` property, die alle parts doorloopt en samenvoegt.
+    """
+    try:
+        parts = response.candidates[0].content.parts
+        if len(parts) == 1 and not parts[0].thought and isinstance(parts[0].text, str):
+            return parts[0].text
+    except (AttributeError, IndexError, TypeError):
+        pass
+    text = getattr(response, "text", None)
+    return text if isinstance(text, str) else ""
+
+
 class VertexChatStrategy:
     def __init__(self, aclient: Any) -> None:
         self._aclient = aclient
         self.model = LLM_VERTEX_CONFIG.get("model_name", "gemini-2.5-flash")
-        self.config = genai_types.GenerateContentConfig(
-            temperature=LLM_VERTEX_CONFIG.get("temperature"),
-            top_p=LLM_VERTEX_CONFIG.get("top_p"),
-            top_k=LLM_VERTEX_CONFIG.get("top_k"),
-            max_output_tokens=LLM_VERTEX_CONFIG.get("max_output_tokens"),
-        )
+        self.config = _generate_content_config()
 
     async def chat(self, messages: list[dict]) -> dict:
-        system_instructions = []
-        final_messages = []
+        # Eén pass: Content-objecten direct opbouwen, system-berichten apart verzamelen
+        system_instructions: list[str] = []
+        contents_list: list[genai_types.Content] = []
+        first_text = ""
         for m in messages:
             role = m.get("role", "user").strip().lower()
             content = m.get("content", "")
             if role == "system":
                 system_instructions.append(content)
             elif role in ("user", "model"):
-                final_messages.append(m)
+                if not contents_list:
+                    first_text = content
+                contents_list.append(
+                    genai_types.Content(role=role, parts=[genai_types.Part.from_text(text=content)])
+                )
 
         if system_instructions:
-            full_system_prompt = "\n\n".join(system_instructions) + "\n\n"
-            if final_messages and final_messages[0]["role"] == "user":
-                final_messages[0]["content"] = full_system_prompt + final_messages[0]["content"]
-            elif final_messages:
-                final_messages.insert(0, {"role": "user", "content": full_system_prompt})
+            # System-instructies gaan vóór het eerste user-bericht; berichten van de
+            # aanroeper worden niet gemuteerd
+            full_system_prompt = _system_prefix(tuple(system_instructions))
+            if contents_list and contents_list[0].role == "user":
+                contents_list[0] = genai_types.Content(
+                    role="user",
+                    parts=[genai_types.Part.from_text(text=full_system_prompt + first_text)],
+                )
             else:
-                final_messages.append({"role": "user", "content": full_system_prompt})
+                contents_list.insert(
+                    0,
+                    genai_types.Content(
+                        role="user", parts=[genai_types.Part.from_text(text=full_system_prompt)]
+                    ),
+                )
 
-        contents_list = [
-            genai_types.Content(role=m["role"], parts=[genai_types.Part(text=m["content"])])
-            for m in final_messages
-        ]
         response = await self._aclient.models.generate_content(
             model=self.model,
             contents=contents_list,
             config=self.config,
         )
-        text = getattr(response, "text", None) or getattr(response, "output_text", None)
-        if text is None:
-            text = ""
-        return {"message": {"content": str(text)}}
+        return {"message": {"content": _extract_text(response)}}
 
 
 class VertexGenerateStrategy:
     def __init__(self, aclient: Any) -> None:
         self._aclient = aclient
         self.model = LLM_VERTEX_CONFIG.get("model_name", "gemini-2.5-flash")
-        self.config = genai_types.GenerateContentConfig(
-            temperature=LLM_VERTEX_CONFIG.get("temperature"),
-            top_p=LLM_VERTEX_CONFIG.get("top_p"),
-            top_k=LLM_VERTEX_CONFIG.get("top_k"),
-            max_output_tokens=LLM_VERTEX_CONFIG.get("max_output_tokens"),
-        )
+        self.config = _generate_content_config()
 
-    async def generate(self, prompt: str) -> dict:
+    async def generate(self, prompt: str, max_tokens: Optional[int] = None) -> dict:
+        config = self.config
+        if max_tokens is not None:
+            config = self.config.model_copy(update={"max_output_tokens": int(max_tokens)})
         contents_list = [
             genai_types.Content(
                 role="user",
@@ -83,9 +170,6 @@ class VertexGenerateStrategy:
         response = await self._aclient.models.generate_content(
             model=self.model,
             contents=contents_list,
-            config=self.config,
+            config=config,
         )
-        text = getattr(response, "text", None) or getattr(response, "output_text", None)
-        if text is None:
-            text = ""
-        return {"message": {"content": str(text)}}
+        return {"message": {"content": _extract_text(response)}}
@@ -0,0 +1,222 @@
+"""
+Logging setup voor GitHub Copilot Metastudy
+Past LOGGING_CONFIG toe en verplaatst het schrijven van logregels naar een achtergrondthread.
+"""
+
+import atexit
+import logging
+import logging.config
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import weakref
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+
+from src.config import LOGGING_CONFIG
+
+_listeners: list[QueueListener] = []
+# Queue + listener waarmee worker-processen via het hoofdproces loggen (zie worker_log_queue)
+_worker_queue: Optional[multiprocessing.Queue] = None
+_worker_listener: Optional[QueueListener] = None
+_worker_lock = threading.Lock()
+
+
+class FastFormatter(logging.Formatter):
+    """Formatter die ``%(asctime)s`` per seconde cachet i.p.v. strftime per record.
+
+    Alleen geldig voor een datefmt zonder sub-seconde velden (zoals in LOGGING_CONFIG).
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._time_cache: tuple[int, str] = (-1, "")
+
+    def formatTime(self, record, datefmt=None) -> str:
+        if not datefmt:
+            return super().formatTime(record, datefmt)
+        second = int(record.created)
+        cached_second, cached_text = self._time_cache
+        if cached_second != second:
+            cached_text = time.strftime(datefmt, self.converter(record.created))
+            self._time_cache = (second, cached_text)
+        return cached_text
+
+
+class BufferedRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler met een grote schrijfbuffer en flush per interval i.p.v. per record.
+
+    Een achtergrondthread flusht elke ``flush_interval`` seconden; ``close()``/``flush()``
+    schrijven de buffer altijd direct weg.
+
+    De bijgehouden bestandsgrootte gaat uit van één schrijvend proces; worker-processen loggen
+    daarom via worker_log_queue() naar het hoofdproces i.p.v. een eigen instantie te openen.
+    """
+
+    _instances: "weakref.WeakSet[BufferedRotatingFileHandler]" = weakref.WeakSet()
+
+    def __init__(
+        self,
+        filename,
+        mode: str = "a",
+        maxBytes: int = 0,
+        backupCount: int = 0,
+        encoding=None,
+        delay: bool = False,
+        errors=None,
+        buffer_size: int = 64 * 1024,
+        flush_interval: float = 1.0,
+    ) -> None:
+        self.buffer_size = int(buffer_size)
+        self.flush_interval = float(flush_interval)
+        self._size = 0
+        self._stop_flushing = threading.Event()
+        super().__init__(filename, mode, maxBytes, backupCount, encoding, delay, errors)
+        BufferedRotatingFileHandler._instances.add(self)
+        threading.Thread(
+            target=self._flush_periodically, name="log-flush", daemon=True
+        ).start()
+
+    def _open(self):
+        stream = open(
+            self.baseFilename,
+            self.mode,
+            buffering=self.buffer_size,
+            encoding=self.encoding,
+            errors=self.errors,
+        )
+        self._size = os.fstat(stream.fileno()).st_size
+        return stream
+
+    def _encoded_size(self, msg: str) -> int:
+        # maxBytes telt bytes, geen tekens: emoji en accenten zijn in UTF-8 meerdere bytes
+        return len(msg.encode(self.encoding or "utf-8", "replace"))
+
+    def shouldRollover(self, record) -> bool:
+        # Grootte zelf bijhouden: stream.seek()/tell() zou de buffer bij elk record legen
+        if self.maxBytes <= 0:
+            return False
+        if self.stream is None:
+            self.stream = self._open()
+        msg = self.format(record) + self.terminator
+        return self._size + self._encoded_size(msg) >= self.maxBytes
+
+    def emit(self, record) -> None:
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            msg = self.format(record) + self.terminator
+            size = self._encoded_size(msg)
+            if self.maxBytes > 0 and self._size + size >= self.maxBytes:
+                self.doRollover()
+                if self.stream is None:
+                    self.stream = self._open()
+            # Geen flush per record; dat doet de achtergrondthread
+            self.stream.write(msg)
+            self._size += size
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def _flush_periodically(self) -> None:
+        while not self._stop_flushing.wait(self.flush_interval):
+            self.flush()
+
+    def close(self) -> None:
+        self._stop_flushing.set()
+        super().close()
+
+
+def _flush_buffered_handlers() -> None:
+    # Vóór een fork legen, anders schrijft het kindproces de geërfde buffer nogmaals weg
+    for handler in list(BufferedRotatingFileHandler._instances):
+        handler.flush()
+
+
+os.register_at_fork(before=_flush_buffered_handlers)
+
+
+def setup_logging() -> None:
+    """Configureer logging via LOGGING_CONFIG met QueueHandler/QueueListener write-behind.
+
+    De handlers uit de config (console, roterend bestand) worden per logger achter een
+    queue gezet, zodat een logaanroep in een hot loop geen write-syscall op de aanroepende
+    thread (of event loop) meer doet. Idempotent: herhaalde aanroepen doen niets.
+    """
+    if _listeners:
+        return
+
+    logging.config.dictConfig(LOGGING_CONFIG)
+
+    logger_names = [""] + list(LOGGING_CONFIG.get("loggers", {}))
+    for name in logger_names:
+        logger = logging.getLogger(name)
+        handlers = list(logger.handlers)
+        if not handlers:
+            continue
+        log_queue: queue.Queue = queue.Queue(-1)
+        listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        for handler in handlers:
+            logger.removeHandler(handler)
+        logger.addHandler(QueueHandler(log_queue))
+        listener.start()
+        _listeners.append(listener)
+
+    atexit.register(_stop_listeners)
+
+
+def _stop_listeners() -> None:
+    """Leeg de queues en sluit de handlers bij het afsluiten van het proces."""
+    global _worker_listener
+    # Eerst de worker-listener: die zet records nog door naar de listeners hieronder
+    if _worker_listener is not None:
+        _worker_listener.stop()
+        _worker_listener = None
+    while _listeners:
+        _listeners.pop().stop()
+
+
+class _DispatchHandler(logging.Handler):
+    """Geeft een record uit een worker-proces door aan de gelijknamige logger in dit proces."""
+
+    def emit(self, record) -> None:
+        logging.getLogger(record.name).handle(record)
+
+
+def worker_log_queue() -> multiprocessing.Queue:
+    """Queue voor logregels uit worker-processen; meegeven aan setup_worker_logging.
+
+    Eén listener-thread in dit proces zet de records door naar de gewone loggers, zodat het
+    hoofdproces de enige schrijver van (en roteerder van) het logbestand blijft.
+    """
+    global _worker_queue, _worker_listener
+    with _worker_lock:
+        if _worker_queue is None:
+            _worker_queue = multiprocessing.Queue(-1)
+            _worker_listener = QueueListener(_worker_queue, _DispatchHandler())
+            _worker_listener.start()
+            atexit.register(_stop_listeners)
+    return _worker_queue
+
+
+def setup_worker_logging(log_queue: multiprocessing.Queue) -> None:
+    """Initializer voor worker-processen: stuur alle logregels naar het hoofdproces.
+
+    Een geforkt proces erft de QueueHandlers van setup_logging, maar niet de listener-threads.
+    Elke logger met handlers in LOGGING_CONFIG krijgt daarom alleen een QueueHandler op
+    log_queue (zie worker_log_queue); levels en propagate komen uit dezelfde config.
+    """
+    loggers = {"": LOGGING_CONFIG.get("root", {}), **LOGGING_CONFIG.get("loggers", {})}
+    for name, cfg in loggers.items():
+        logger = logging.getLogger(name)
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+        if "level" in cfg:
+            logger.setLevel(cfg["level"])
+        if name:
+            logger.propagate = cfg.get("propagate", True)
+        if cfg.get("handlers"):
+            logger.addHandler(QueueHandler(log_queue))
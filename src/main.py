@@ -1,13 +1,10 @@
 #!/usr/bin/env python3
-import logging
-import logging.config
-
-from src.config import LOGGING_CONFIG
+from src.logging_setup import setup_logging
 from src.cli.app import main as cli_main
 
 
 def main():
-    logging.config.dictConfig(LOGGING_CONFIG)
+    setup_logging()
     cli_main()
 
 
@@ -44,6 +44,15 @@ class TestPaperDatabase(unittest.TestCase):
         # Check existence
         self.assertTrue(self.db.paper_exists("test.12345v1"))
 
+    def test_insert_papers_bulk_and_papers_exist(self):
+        """Test bulk insert skips existing papers and papers_exist returns the inserted ids"""
+        rows = [{"arxiv_id": "test.bulk1v1"}, {"arxiv_id": "test.bulk2v1"}]
+        self.assertEqual(self.db.insert_papers_bulk(rows), 2)
+        self.assertEqual(self.db.insert_papers_bulk(rows), 0)
+
+        existing = self.db.papers_exist(["test.bulk1v1", "test.bulk2v1", "nonexistent_id"])
+        self.assertEqual(existing, {"test.bulk1v1", "test.bulk2v1"})
+
     def test_get_papers_by_status(self):
         """Test retrieving papers by status"""
         # Insert test paper
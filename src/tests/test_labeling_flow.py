@@ -10,6 +10,7 @@ class DummyDB:
         {"metadata_id": "C", "question_id": 7},
     ]
     upserts = []
+    completed = []
 
     def __init__(self):
         pass
@@ -17,6 +18,17 @@ class DummyDB:
     def pop_next_labeling_job(self):
         return self.jobs.pop(0) if self.jobs else None
 
+    def pop_next_labeling_jobs(self, limit):
+        popped = []
+        while self.jobs and len(popped) < limit:
+            job = self.jobs.pop(0)
+            question = self.get_question_by_id(job["question_id"])
+            ta = self.get_title_and_abstract(job["metadata_id"])
+            popped.append(
+                {**job, "label_id": question["label_id"], "prompt": question["prompt"], **ta}
+            )
+        return popped
+
     def get_question_by_id(self, qid):
         return {"id": 7, "prompt": "Is about X?", "label_id": 3}
 
@@ -27,6 +39,16 @@ class DummyDB:
     def upsert_metadata_label(self, metadata_id, label_id, confidence_score=None):
         self.upserts.append((metadata_id, label_id, confidence_score))
 
+    def upsert_metadata_labels_many(self, rows):
+        self.upserts.extend(rows)
+
+    def complete_labeling_jobs(self, labels, done_jobs):
+        self.upserts.extend(labels)
+        self.completed.extend(done_jobs)
+
+    def requeue_stale_labeling_jobs(self, older_than_minutes):
+        return 0
+
 
 class DummyChatClient:
     async def __aenter__(self):
@@ -47,6 +69,14 @@ class DummyChecker:
             "confidence_score": 0.9 if applicable else None,
         }
 
+    async def classify_title_abstract_batch_async(self, question, items):
+        return [
+            await self.classify_title_abstract_structured_async(
+                question, item["title"], item["abstract"]
+            )
+            for item in items
+        ]
+
 
 def test_run_labeling_queue_smoke(monkeypatch):
     import src.workflows.labeling as labeling_mod
@@ -57,8 +87,9 @@ def test_run_labeling_queue_smoke(monkeypatch):
         {"metadata_id": "C", "question_id": 7},
     ]
     DummyDB.upserts = []
+    DummyDB.completed = []
 
-    monkeypatch.setattr(labeling_mod, "PaperDatabase", DummyDB)
+    monkeypatch.setattr(labeling_mod, "get_db", DummyDB)
     monkeypatch.setattr(labeling_mod, "LLMClient", DummyChatClient)
     monkeypatch.setattr(labeling_mod, "LLMChecker", DummyChecker)
 
@@ -68,3 +99,17 @@ def test_run_labeling_queue_smoke(monkeypatch):
     assert stats["skipped_missing"] == 0
     assert stats["labeled"] == 1
     assert DummyDB.upserts == [("B", 3, 0.9)]
+    assert sorted(DummyDB.completed) == [("A", 7), ("B", 7), ("C", 7)]
+
+
+def test_fit_abstract_keeps_head_and_tail_within_budget():
+    from src.workflows.labeling import _fit_abstract
+
+    abstract = "begin " + "x" * 1000 + " einde"
+    fitted, truncated = _fit_abstract("titel", abstract, max_tokens=50)
+
+    assert truncated
+    assert fitted.startswith("begin")
+    assert fitted.endswith("einde")
+    assert (len("titel") + len(fitted)) // 4 <= 50
+    assert _fit_abstract("titel", "kort", max_tokens=50) == ("kort", False)
@@ -0,0 +1,60 @@
+import logging
+
+from src.llm import llm_converter
+
+
+class FakeClient:
+    """Geeft de LaTeX terug als 'Markdown', afgekapt op max_tokens (~3 tekens per token)."""
+
+    calls = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def generate(self, prompt, max_tokens=None):
+        self.calls.append(prompt)
+        body = prompt[len(llm_converter.SYSTEM_INSTRUCTIONS) :]
+        if body.startswith("The input below"):
+            body = body.split("\n\n", 1)[1]
+        else:
+            body = body.lstrip("\n")
+        return {"message": {"content": body[: max_tokens * 3]}}
+
+
+def _use_fake_vertex(monkeypatch):
+    FakeClient.calls = []
+    monkeypatch.setattr(llm_converter, "LLMClient", FakeClient)
+    monkeypatch.setitem(llm_converter.LLM_GENERAL_CONFIG, "provider", "vertex")
+    monkeypatch.setitem(llm_converter.LLM_VERTEX_CONFIG, "max_output_tokens", 4096)
+    monkeypatch.setitem(llm_converter.LLM_VERTEX_CONFIG, "max_chars_per_chunk", 20000)
+    monkeypatch.setitem(llm_converter.LLM_VERTEX_CONFIG, "chunks_per_request", 4)
+    monkeypatch.setitem(llm_converter.LLM_VERTEX_CONFIG, "max_chars_per_request", 40000)
+
+
+def test_two_chunk_document_does_not_fall_back(monkeypatch, caplog):
+    _use_fake_vertex(monkeypatch)
+    latex = "\n\n".join(f"\\section{{S{i}}} " + "tekst " * 100 for i in range(40))
+
+    with caplog.at_level(logging.WARNING, logger=llm_converter.__name__):
+        llm_converter.build_markdown_from_latex(latex)
+
+    # Samen passen de twee chunks niet in 4096 output-tokens: elk een eigen request
+    assert len(FakeClient.calls) == 2
+    assert not any(llm_converter.CHUNK_BREAK in call for call in FakeClient.calls)
+    assert "terugval" not in caplog.text
+
+
+def test_small_chunks_share_one_request(monkeypatch, caplog):
+    _use_fake_vertex(monkeypatch)
+    monkeypatch.setitem(llm_converter.LLM_VERTEX_CONFIG, "max_chars_per_chunk", 1000)
+    latex = "\n\n".join(f"\\section{{S{i}}} " + "tekst " * 100 for i in range(3))
+
+    with caplog.at_level(logging.WARNING, logger=llm_converter.__name__):
+        markdown = llm_converter.build_markdown_from_latex(latex)
+
+    assert len(FakeClient.calls) == 1
+    assert "terugval" not in caplog.text
+    assert markdown.count("\\section") == 3
@@ -0,0 +1,48 @@
+from src.workflows import reporting
+
+
+class DummyDB:
+    def list_questions_and_labels(self):
+        return [
+            {"kind": "q", "id": 1, "name": "q1", "label_id": 3, "label_name": "copilot"},
+            {"kind": "l", "id": 3, "name": "copilot", "label_id": 3, "label_name": "copilot"},
+            {"kind": "l", "id": 4, "name": "llm", "label_id": 4, "label_name": "llm"},
+        ]
+
+
+def test_list_questions_returns_only_strings(monkeypatch):
+    monkeypatch.setattr(reporting, "get_db", lambda: DummyDB())
+
+    out = reporting.list_questions()
+
+    assert all(isinstance(line, str) for line in out)
+    assert out == [
+        "Questions:",
+        "q_id: 1, q_name: q1, label_id: 3, label: copilot",
+        "",
+        "Labels:",
+        "l_id: 3, l_name: copilot",
+        "l_id: 4, l_name: llm",
+    ]
+
+
+def test_format_stats_lists_every_table():
+    text = reporting._format_stats({"metadata": 5})
+
+    assert text.startswith("\n" + "=" * 60 + "\nDATABASE STATISTIEKEN\n")
+    assert "  metadata: 5\n" in text
+    assert "  download_queue: 0\n" in text
+
+
+def test_download_queue_summary_renders_data_without_db():
+    data = {"counts": {"PENDING": 2, "COMPLETED": 5, "FAILED": 3}, "failed_ids": ["1v1", "2v1"]}
+
+    lines = reporting.download_queue_summary(data)
+
+    assert lines[:4] == [
+        "Download Queue Summary:",
+        "  PENDING:   2",
+        "  COMPLETED: 5",
+        "  FAILED:    3",
+    ]
+    assert lines[-3:] == ["  - 1v1", "  - 2v1", "  … en nog 1 (niet getoond)"]
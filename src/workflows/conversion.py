@@ -1,9 +1,104 @@
+import json
 import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+from src.config import STORAGE_CONFIG
+from src.logging_setup import setup_worker_logging, worker_log_queue
 from src.conversion.tex_converter import tex_naar_md
 from src.conversion.pdf_converter import pdf_naar_md
 
+_TEX_DIR = Path(STORAGE_CONFIG["tex_directory"])
+_PDF_DIR = Path(STORAGE_CONFIG["pdf_directory"])
+_MD_DIR = Path(STORAGE_CONFIG["markdown_directory"])
+# Sidecar: arxiv_id -> [st_mtime_ns, st_size] van de bron waaruit de Markdown is gemaakt
+_MD_CACHE_PATH = _MD_DIR / ".cache.json"
+
+SourceSignature = tuple[int, int]
+
+
+def _scan_ids(directory: Path, suffix: str) -> list[str]:
+    """Gesorteerde bestandsnamen zonder suffix, via één scandir (geen Path/stat per bestand)."""
+    try:
+        with os.scandir(directory) as entries:
+            return sorted(
+                entry.name[: -len(suffix)]
+                for entry in entries
+                if entry.name.endswith(suffix) and entry.is_file()
+            )
+    except FileNotFoundError:
+        return []
+
+
+def _scan_sources(directory: Path, suffix: str) -> list[tuple[str, SourceSignature]]:
+    """Als _scan_ids, maar met (mtime_ns, size) per bronbestand uit dezelfde scandir."""
+    try:
+        with os.scandir(directory) as entries:
+            found = []
+            for entry in entries:
+                if entry.name.endswith(suffix) and entry.is_file():
+                    st = entry.stat()
+                    found.append((entry.name[: -len(suffix)], (st.st_mtime_ns, st.st_size)))
+            return sorted(found)
+    except FileNotFoundError:
+        return []
+
+
+def source_signature(path: Path) -> SourceSignature:
+    st = path.stat()
+    return st.st_mtime_ns, st.st_size
+
+
+def _adopt_existing_markdown() -> dict[str, SourceSignature]:
+    """Eerste run met de sidecar: bestaande Markdown overnemen i.p.v. alles opnieuw te maken.
+
+    Elke .md krijgt de signature van zijn bron (TeX vóór PDF, zoals convert_to_md kiest).
+    """
+    existing_md = set(_scan_ids(_MD_DIR, ".md"))
+    cache: dict[str, SourceSignature] = {}
+    for directory, suffix in ((_PDF_DIR, ".pdf"), (_TEX_DIR, ".tex")):
+        for arxiv_id, signature in _scan_sources(directory, suffix):
+            if arxiv_id in existing_md:
+                cache[arxiv_id] = signature
+    return cache
+
+
+def load_md_cache() -> dict[str, SourceSignature]:
+    """Lees de conversie-sidecar (arxiv_id -> bron-signature).
+
+    Bestaat de sidecar nog niet, dan wordt bestaande Markdown één keer overgenomen en direct
+    weggeschreven; zo gedragen convert_to_md en run_download_and_convert zich gelijk.
+    """
+    try:
+        raw = json.loads(_MD_CACHE_PATH.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        cache = _adopt_existing_markdown()
+        save_md_cache(cache)
+        return cache
+    except (OSError, ValueError) as e:
+        logging.getLogger(__name__).warning("Conversie-cache onleesbaar, opnieuw opbouwen: %s", e)
+        return {}
+    return {aid: (int(sig[0]), int(sig[1])) for aid, sig in raw.items()}
+
+
+def is_md_up_to_date(
+    md_cache: dict[str, SourceSignature], arxiv_id: str, signature: SourceSignature, md_exists: bool
+) -> bool:
+    """Markdown is actueel als ze bestaat en uit precies deze bronversie is gemaakt.
+
+    Een .md zonder cache-entry (bv. half geschreven na een crash) geldt als verouderd.
+    """
+    return md_exists and md_cache.get(arxiv_id) == signature
+
+
+def save_md_cache(cache: dict[str, SourceSignature]) -> None:
+    """Schrijf de sidecar atomair weg (tmp-bestand + rename)."""
+    _MD_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = _MD_CACHE_PATH.with_name(_MD_CACHE_PATH.name + ".tmp")
+    tmp.write_text(json.dumps(cache, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, _MD_CACHE_PATH)
+
 
 def convert_to_md() -> dict:
     """Converteer alle beschikbare bronnen naar Markdown.
@@ -14,14 +109,18 @@ def convert_to_md() -> dict:
     - Doelmap: data/md/<arxiv_id>.md
 
     Regels:
-    - Sla over als doelbestand al bestaat
+    - Sla over als doelbestand al bestaat én de bron sinds de vorige conversie niet is gewijzigd
+      (mtime + grootte in data/md/.cache.json); een .md zonder cache-entry (bv. een half
+      geschreven bestand na een crash) wordt opnieuw gemaakt
     - Verwerk eerst TeX, daarna PDF (PDF wordt overgeslagen als TeX al is geconverteerd)
+    - TeX-conversie (pandoc) draait parallel in threads, PDF-conversie (CPU-bound in Python)
+      in een ProcessPoolExecutor
     """
     logger = logging.getLogger(__name__)
 
-    tex_dir = Path("data") / "tex"
-    pdf_dir = Path("data") / "pdf"
-    md_dir = Path("data") / "md"
+    tex_dir = _TEX_DIR
+    pdf_dir = _PDF_DIR
+    md_dir = _MD_DIR
     md_dir.mkdir(parents=True, exist_ok=True)
 
     stats = {
@@ -34,45 +133,79 @@ def convert_to_md() -> dict:
     }
 
     produced_ids: set[str] = set()
+    # Eén scandir van de doelmap i.p.v. een stat() per paper
+    existing_md = set(_scan_ids(md_dir, ".md"))
+
+    md_cache = load_md_cache()
+    signatures: dict[str, SourceSignature] = {}
+
+    def is_up_to_date(arxiv_id: str, signature: SourceSignature) -> bool:
+        return is_md_up_to_date(md_cache, arxiv_id, signature, arxiv_id in existing_md)
+
+    workers = max(1, int(STORAGE_CONFIG.get("convert_workers") or os.cpu_count() or 1))
 
     # 1) TeX -> MD
-    if tex_dir.exists():
-        for tex_path in sorted(tex_dir.glob("*.tex")):
-            arxiv_id = tex_path.stem
-            stats["tex_found"] += 1
-            md_path = md_dir / f"{arxiv_id}.md"
-            if md_path.exists():
-                stats["skipped_existing"] += 1
-                produced_ids.add(arxiv_id)
-                continue
-            try:
-                tex_naar_md(arxiv_id)
-                produced_ids.add(arxiv_id)
-                stats["converted_tex"] += 1
-                logger.info("✅ TeX -> MD: %s", arxiv_id)
-            except Exception as e:  # pragma: no cover
-                stats["errors"] += 1
-                logger.error("❌ TeX conversie mislukt voor %s: %s", arxiv_id, e)
+    tex_ids: list[str] = []
+    for arxiv_id, signature in _scan_sources(tex_dir, ".tex"):
+        stats["tex_found"] += 1
+        if is_up_to_date(arxiv_id, signature):
+            stats["skipped_existing"] += 1
+            produced_ids.add(arxiv_id)
+            continue
+        signatures[arxiv_id] = signature
+        tex_ids.append(arxiv_id)
+
+    if tex_ids:
+        # Threads volstaan: het werk gebeurt in het pandoc-subproces. Een eventuele LLM-fallback
+        # draait per thread in een eigen event loop; build_markdown_from_latex laat er procesbreed
+        # één tegelijk toe, zodat de provider-limiet (batch_size) niet per thread geldt. Eerst de
+        # hele TeX-pool afronden, zodat de PDF-stap weet welke papers al Markdown hebben.
+        with ThreadPoolExecutor(max_workers=min(workers, len(tex_ids))) as executor:
+            futures = {executor.submit(tex_naar_md, aid): aid for aid in tex_ids}
+            for fut in as_completed(futures):
+                arxiv_id = futures[fut]
+                try:
+                    fut.result()
+                    produced_ids.add(arxiv_id)
+                    md_cache[arxiv_id] = signatures[arxiv_id]
+                    stats["converted_tex"] += 1
+                    logger.info("✅ TeX -> MD: %s", arxiv_id)
+                except Exception as e:  # pragma: no cover
+                    stats["errors"] += 1
+                    logger.error("❌ TeX conversie mislukt voor %s: %s", arxiv_id, e)
 
     # 2) PDF -> MD (alleen als er nog geen MD is geproduceerd)
-    if pdf_dir.exists():
-        for pdf_path in sorted(pdf_dir.glob("*.pdf")):
-            arxiv_id = pdf_path.stem
-            stats["pdf_found"] += 1
-            if arxiv_id in produced_ids:
-                continue
-            md_path = md_dir / f"{arxiv_id}.md"
-            if md_path.exists():
-                stats["skipped_existing"] += 1
-                continue
-            try:
-                pdf_naar_md(arxiv_id)
-                stats["converted_pdf"] += 1
-                logger.info("✅ PDF -> MD: %s", arxiv_id)
-            except Exception as e:  # pragma: no cover
-                stats["errors"] += 1
-                logger.error("❌ PDF conversie mislukt voor %s: %s", arxiv_id, e)
+    to_convert: list[str] = []
+    for arxiv_id, signature in _scan_sources(pdf_dir, ".pdf"):
+        stats["pdf_found"] += 1
+        if arxiv_id in produced_ids:
+            continue
+        if is_up_to_date(arxiv_id, signature):
+            stats["skipped_existing"] += 1
+            continue
+        signatures[arxiv_id] = signature
+        to_convert.append(arxiv_id)
+
+    if to_convert:
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(to_convert)),
+            initializer=setup_worker_logging,
+            initargs=(worker_log_queue(),),
+        ) as executor:
+            futures = {executor.submit(pdf_naar_md, aid): aid for aid in to_convert}
+            for fut in as_completed(futures):
+                arxiv_id = futures[fut]
+                try:
+                    fut.result()
+                    md_cache[arxiv_id] = signatures[arxiv_id]
+                    stats["converted_pdf"] += 1
+                    logger.info("✅ PDF -> MD: %s", arxiv_id)
+                except Exception as e:  # pragma: no cover
+                    stats["errors"] += 1
+                    logger.error("❌ PDF conversie mislukt voor %s: %s", arxiv_id, e)
 
+    # Eén keer wegschrijven aan het eind i.p.v. per paper
+    save_md_cache(md_cache)
     return stats
 
 
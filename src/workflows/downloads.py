@@ -4,20 +4,33 @@ import re
 import tarfile
 import shutil
 from pathlib import Path
+from typing import Callable
 
-from src.config import DOWNLOAD_CONFIG
-from src.database import PaperDatabase
+from src.config import DOWNLOAD_CONFIG, STORAGE_CONFIG
+from src.database import get_db
 from src.arxiv import ArxivClient
 
+_TEX_DIR = Path(STORAGE_CONFIG["tex_directory"])
+_PDF_DIR = Path(STORAGE_CONFIG["pdf_directory"])
+_COPY_CHUNK_BYTES = 1 << 20
+# Statusupdates per blok vastleggen: weinig commits, en bij een crash gaat hooguit één blok verloren
+_STATUS_FLUSH_SIZE = 64
+# arXiv-id (met versie) vooraan een tarballnaam, bv. '2101.00001v2' in '2101.00001v2.tar.gz'
+_TARBALL_ID_RE = re.compile(r"^(.+?v\d+)(?!\d)")
 
-def run_downloads(limit: int | None = None) -> dict:
+
+def run_downloads(
+    limit: int | None = None, on_downloaded: Callable[[str, str], None] | None = None
+) -> dict:
     """Verwerk tot 'limit' items uit download_queue en download tarballs.
 
     - Schrijft naar DOWNLOAD_CONFIG['tarball_directory']
     - Update status naar COMPLETED of FAILED
+    - on_downloaded(arxiv_id, "tex"|"pdf") wordt aangeroepen zodra een bronbestand klaarstaat,
+      zodat een aanroeper de conversie kan laten overlappen met de volgende download
     """
     logger = logging.getLogger(__name__)
-    db = PaperDatabase()
+    db = get_db()
     client = ArxivClient()
 
     max_items = (
@@ -27,8 +40,19 @@ def run_downloads(limit: int | None = None) -> dict:
     )
     tarball_dir = Path(DOWNLOAD_CONFIG.get("tarball_directory", "data/tarball"))
     tarball_dir.mkdir(parents=True, exist_ok=True)
+    # Doelmappen één keer per run aanmaken i.p.v. per paper
+    _TEX_DIR.mkdir(parents=True, exist_ok=True)
+    _PDF_DIR.mkdir(parents=True, exist_ok=True)
 
     pending_ids = db.get_pending_downloads(max_items)
+    # Eén scandir per run, geïndexeerd op arXiv-id: O(1) lookup per paper i.p.v. een scan
+    tarball_by_id: dict[str, str] = {}
+    with os.scandir(tarball_dir) as entries:
+        for entry in entries:
+            # Alleen complete archieven: een achtergebleven .part is een afgebroken download
+            if entry.is_file() and not entry.name.endswith(".part"):
+                m = _TARBALL_ID_RE.match(entry.name)
+                tarball_by_id.setdefault(m.group(1) if m else entry.name, entry.name)
 
     stats = {
         "requested": max_items,
@@ -41,69 +65,61 @@ def run_downloads(limit: int | None = None) -> dict:
         logger.info("Geen pending downloads gevonden.")
         return stats
 
-    # Helpers
-    def _extract_and_copy_main_tex(tarball_path: str, aid: str) -> None:
-        extracted_base = tarball_dir / "extracted"
-        extracted_dir = extracted_base / aid
-        extracted_dir.mkdir(parents=True, exist_ok=True)
-
-        def _is_within_directory(directory: str, target: str) -> bool:
-            abs_directory = os.path.abspath(directory)
-            abs_target = os.path.abspath(target)
-            return os.path.commonpath([abs_directory]) == os.path.commonpath(
-                [abs_directory, abs_target]
-            )
-
-        def _safe_extract(tar: tarfile.TarFile, path: str) -> None:
-            for member in tar.getmembers():
-                member_path = os.path.join(path, member.name)
-                if not _is_within_directory(path, member_path):
-                    raise Exception("Blocked path traversal in tar file")
-            tar.extractall(path)
+    # PDF's van eerdere runs: niet opnieuw bij arXiv opvragen
+    with os.scandir(_PDF_DIR) as entries:
+        existing_pdfs = {entry.name for entry in entries if entry.is_file()}
 
-        with tarfile.open(tarball_path, "r:*") as tf:
-            _safe_extract(tf, str(extracted_dir))
-
-        largest_tex: Path | None = None
-        largest_size = -1
-        for root, _dirs, files in os.walk(extracted_dir):
-            for fname in files:
-                if fname.lower().endswith(".tex"):
-                    fpath = Path(root) / fname
-                    try:
-                        size = fpath.stat().st_size
-                    except Exception:
-                        continue
-                    if size > largest_size:
-                        largest_size = size
-                        largest_tex = fpath
-
-        if largest_tex is not None:
-            tex_out_dir = Path("data") / "tex"
-            tex_out_dir.mkdir(parents=True, exist_ok=True)
-            dest = tex_out_dir / f"{aid}.tex"
-            shutil.copy2(str(largest_tex), str(dest))
-            logger.info("📄 Extracted main TEX: %s -> %s", largest_tex, dest)
-        else:
-            logger.warning("⚠️  Geen .tex-bestanden gevonden na extractie voor %s", aid)
-
-        # Opruimen uitgepakte content, tarball blijft staan
+    # Helpers
+    def _notify(aid: str, kind: str) -> None:
+        if on_downloaded is None:
+            return
         try:
-            shutil.rmtree(extracted_dir)
-            logger.info("🧹 Removed extracted directory: %s", extracted_dir)
-        except Exception as cleanup_err:  # pragma: no cover
-            logger.warning(
-                "Kon extracted directory niet verwijderen (%s): %s", extracted_dir, cleanup_err
-            )
+            on_downloaded(aid, kind)
+        except Exception:  # pragma: no cover
+            logger.exception("on_downloaded callback faalde voor %s", aid)
+
+    def _extract_and_copy_main_tex(tarball_path: str, aid: str) -> bool:
+        dest = _TEX_DIR / f"{aid}.tex"
+        if dest.exists():
+            # Al eerder uitgepakt; of de Markdown actueel is bepaalt de conversie-cache
+            logger.info("📄 TEX bestaat al voor %s: %s — uitpakken overgeslagen", aid, dest)
+            return True
+
+        # Geen volledige extractie naar schijf: alleen de grootste .tex wordt uit de tar
+        # gestreamd; figuren, bibs e.d. raken de schijf niet en er valt niets op te ruimen
+        with tarfile.open(tarball_path, "r:*") as tf:
+            main_tex: tarfile.TarInfo | None = None
+            for member in tf:
+                if member.isreg() and member.name.lower().endswith(".tex"):
+                    if main_tex is None or member.size > main_tex.size:
+                        main_tex = member
+
+            if main_tex is None:
+                logger.warning("⚠️  Geen .tex-bestanden gevonden in tarball voor %s", aid)
+                return False
+
+            name = main_tex.name
+            if os.path.isabs(name) or ".." in Path(name).parts:
+                raise Exception("Blocked path traversal in tar file")
+
+            tmp = dest.with_name(dest.name + ".part")
+            src = tf.extractfile(main_tex)
+            if src is None:  # pragma: no cover - isreg() garandeert een bestand
+                return False
+            with src, open(tmp, "wb") as out:
+                shutil.copyfileobj(src, out, _COPY_CHUNK_BYTES)
+            os.replace(tmp, dest)
+
+        logger.info("📄 Extracted main TEX: %s -> %s", name, dest)
+        return True
 
     def _prev_version(aid: str) -> str | None:
-        m = re.search(r"^(.*)v(\d+)$", aid)
-        if not m:
+        # rpartition i.p.v. regex: splitst op de laatste 'v', zoals ^(.*)v(\d+)$
+        base, sep, ver = aid.rpartition("v")
+        if not sep or not ver.isdecimal():
             return None
-        base, ver = m.group(1), int(m.group(2))
-        if ver <= 1:
-            return None
-        return f"{base}v{ver-1}"
+        num = int(ver)
+        return f"{base}v{num - 1}" if num > 1 else None
 
     # Chain of Responsibility onderdelen
     class Handler:
@@ -119,7 +135,8 @@ def run_downloads(limit: int | None = None) -> dict:
         def handle(self, aid: str) -> bool:
             try:
                 tarball_path = client.download_paper_source(arxiv_id=aid, dirpath=str(tarball_dir))
-                _extract_and_copy_main_tex(tarball_path, aid)
+                if _extract_and_copy_main_tex(tarball_path, aid):
+                    _notify(aid, "tex")
                 return True
             except Exception as e:  # pragma: no cover
                 logger.info("Tarball download mislukt voor %s: %s", aid, e)
@@ -127,11 +144,14 @@ def run_downloads(limit: int | None = None) -> dict:
 
     class PdfHandler(Handler):
         def handle(self, aid: str) -> bool:
+            if f"{aid.replace('/', '_')}.pdf" in existing_pdfs:
+                logger.info("📄 PDF bestaat al voor %s — download overgeslagen", aid)
+                _notify(aid, "pdf")
+                return True
             try:
-                pdf_dir = Path("data") / "pdf"
-                pdf_dir.mkdir(parents=True, exist_ok=True)
-                _ = client.download_paper_pdf(arxiv_id=aid, dirpath=str(pdf_dir))
+                _ = client.download_paper_pdf(arxiv_id=aid, dirpath=str(_PDF_DIR))
                 logger.info("📄 PDF downloaded for %s", aid)
+                _notify(aid, "pdf")
                 return True
             except Exception as e:  # pragma: no cover
                 logger.info("PDF download mislukt voor %s: %s", aid, e)
@@ -144,7 +164,8 @@ def run_downloads(limit: int | None = None) -> dict:
                 return super().handle(aid)
             try:
                 tarball_path = client.download_paper_source(arxiv_id=prev, dirpath=str(tarball_dir))
-                _extract_and_copy_main_tex(tarball_path, prev)
+                if _extract_and_copy_main_tex(tarball_path, prev):
+                    _notify(prev, "tex")
                 logger.info("✅ Tarball gedownload van eerdere versie %s voor %s", prev, aid)
                 return True
             except Exception as e:  # pragma: no cover
@@ -156,50 +177,68 @@ def run_downloads(limit: int | None = None) -> dict:
             prev = _prev_version(aid)
             if not prev:
                 return super().handle(aid)
+            if f"{prev.replace('/', '_')}.pdf" in existing_pdfs:
+                logger.info("📄 PDF bestaat al voor %s (%s) — download overgeslagen", prev, aid)
+                _notify(prev, "pdf")
+                return True
             try:
-                pdf_dir = Path("data") / "pdf"
-                pdf_dir.mkdir(parents=True, exist_ok=True)
-                _ = client.download_paper_pdf(arxiv_id=prev, dirpath=str(pdf_dir))
+                _ = client.download_paper_pdf(arxiv_id=prev, dirpath=str(_PDF_DIR))
+                _notify(prev, "pdf")
                 logger.info("✅ PDF gedownload van eerdere versie %s voor %s", prev, aid)
                 return True
             except Exception as e:  # pragma: no cover
                 logger.info("PDF vorige versie mislukt voor %s (%s): %s", aid, prev, e)
                 return super().handle(aid)
 
-    for arxiv_id in pending_ids:
-        stats["attempted"] += 1
+    # Statusupdates verzamelen en in één transactie wegschrijven i.p.v. één commit per paper.
+    # Downloads zelf blijven sequentieel (arXiv ToU: één verbinding, max 1 request per 3s).
+    status_updates: list[tuple[str, str]] = []
+
+    def _flush_statuses() -> None:
         try:
-            # 1) Vind bestaande tarball of download indien nodig
-            existing = next(
-                (p for p in tarball_dir.iterdir() if p.is_file() and p.name.startswith(arxiv_id)),
-                None,
+            db.set_download_statuses(status_updates)
+        except Exception:
+            logger.exception(
+                "Kon downloadstatussen niet bijwerken (%s items)", len(status_updates)
             )
-            if existing is not None:
-                logger.info(
-                    "📦 Tarball bestaat al voor %s: %s — overslaan en markeren als COMPLETED",
-                    arxiv_id,
-                    existing,
-                )
-                db.set_download_status(arxiv_id, "COMPLETED")
-                stats["completed"] += 1
-                logger.info("✅ Download COMPLETED (reused): %s", arxiv_id)
-                continue
-            # Chain opbouwen: tarball -> pdf -> prev tarball -> prev pdf
-            chain = TarballHandler(PdfHandler(PrevVersionTarballHandler(PrevVersionPdfHandler())))
-            success = chain.handle(arxiv_id)
-
-            if success:
-                db.set_download_status(arxiv_id, "COMPLETED")
-                stats["completed"] += 1
-                logger.info("✅ Download COMPLETED (chain): %s", arxiv_id)
-            else:
-                raise RuntimeError("Geen downloadvariant geslaagd")
-        except Exception as e:  # pragma: no cover
-            logger.error("❌ Download FAILED: %s (%s)", arxiv_id, e)
+        status_updates.clear()
+
+    try:
+        for arxiv_id in pending_ids:
+            if len(status_updates) >= _STATUS_FLUSH_SIZE:
+                _flush_statuses()
+            stats["attempted"] += 1
             try:
-                db.set_download_status(arxiv_id, "FAILED")
-            except Exception:
-                logger.exception("Kon status niet bijwerken voor %s", arxiv_id)
-            stats["failed"] += 1
+                # 1) Vind bestaande tarball of download indien nodig
+                existing = tarball_by_id.get(arxiv_id)
+                if existing is not None:
+                    logger.info(
+                        "📦 Tarball bestaat al voor %s: %s — overslaan en markeren als COMPLETED",
+                        arxiv_id,
+                        existing,
+                    )
+                    status_updates.append((arxiv_id, "COMPLETED"))
+                    stats["completed"] += 1
+                    logger.info("✅ Download COMPLETED (reused): %s", arxiv_id)
+                    continue
+                # Chain opbouwen: tarball -> pdf -> prev tarball -> prev pdf
+                chain = TarballHandler(
+                    PdfHandler(PrevVersionTarballHandler(PrevVersionPdfHandler()))
+                )
+                success = chain.handle(arxiv_id)
+
+                if success:
+                    status_updates.append((arxiv_id, "COMPLETED"))
+                    stats["completed"] += 1
+                    logger.info("✅ Download COMPLETED (chain): %s", arxiv_id)
+                else:
+                    raise RuntimeError("Geen downloadvariant geslaagd")
+            except Exception as e:  # pragma: no cover
+                logger.error("❌ Download FAILED: %s (%s)", arxiv_id, e)
+                status_updates.append((arxiv_id, "FAILED"))
+                stats["failed"] += 1
+    finally:
+        # Ook bij een onderbreking de al verwerkte items vastleggen
+        _flush_statuses()
 
     return stats
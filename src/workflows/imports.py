@@ -1,28 +1,30 @@
 import logging
-from pathlib import Path
-from importlib import import_module
+
+from src.config import PROJECT_ROOT
+from src.database import importer as db_import
 
 logger = logging.getLogger(__name__)
 
+METADATA_JSON_PATH = str(PROJECT_ROOT / "data" / "metadata" / "arxiv-metadata-oai-snapshot.json")
+SCHEMA_PATH = str(PROJECT_ROOT / "data" / "metadataschema.json")
+LABELS_PATH = str(PROJECT_ROOT / "data" / "labels.json")
 
-def run_metadata_import(max_records: int | None = None, batch_size: int = 1000) -> int:
-    project_root = Path(__file__).resolve().parents[2]
-    json_path = str(project_root / "data" / "metadata" / "arxiv-metadata-oai-snapshot.json")
-    schema_path = str(project_root / "data" / "metadataschema.json")
 
-    db_import = import_module("src.database.import")
+def run_metadata_import(max_records: int | None = None, batch_size: int = 1000) -> int:
     logger.info("📥 Metadata import start")
-    logger.info(f"  - JSON: {json_path}")
-    logger.info(f"  - Schema: {schema_path}")
+    logger.info("  - JSON: %s", METADATA_JSON_PATH)
+    logger.info("  - Schema: %s", SCHEMA_PATH)
     count = db_import.import_metadata(
-        json_path=json_path, schema_path=schema_path, max_records=max_records, batch_size=batch_size
+        json_path=METADATA_JSON_PATH,
+        schema_path=SCHEMA_PATH,
+        max_records=max_records,
+        batch_size=batch_size,
     )
-    logger.info(f"✅ Metadata import voltooid: {count} records toegevoegd")
+    logger.info("✅ Metadata import voltooid: %s records toegevoegd", count)
     return count
 
 
 def run_paper_preparation(batch_size: int | None = None, limit: int | None = None) -> int:
-    db_import = import_module("src.database.import")
     kwargs = {}
     if batch_size is not None:
         kwargs["batch_size"] = int(batch_size)
@@ -35,11 +37,8 @@ def run_paper_preparation(batch_size: int | None = None, limit: int | None = Non
 
 
 def import_labels_questions() -> int:
-    db_import = import_module("src.database.import")
-    project_root = Path(__file__).resolve().parents[2]
-    labels_path = str(project_root / "data" / "labels.json")
     logger.info("🌱 Importing labels/questions start")
-    logger.info(f"  - Labels: {labels_path}")
-    added = db_import.import_labels_questions(labels_path=labels_path)
-    logger.info(f"✅ Import voltooid: {added} items toegevoegd/gededupliceerd")
+    logger.info("  - Labels: %s", LABELS_PATH)
+    added = db_import.import_labels_questions(labels_path=LABELS_PATH)
+    logger.info("✅ Import voltooid: %s items toegevoegd/gededupliceerd", added)
     return added
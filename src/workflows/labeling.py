@@ -2,127 +2,176 @@ import asyncio
 import logging
 import time
 
-from src.database import PaperDatabase
+from src.config import LLM_GENERAL_CONFIG, PROCESSING_CONFIG
+from src.database import get_db
 from src.llm import LLMChecker
 from src.llm.llm_clients import LLMClient
 
+# Aantal afgeronde jobs per checkpoint (labels upserten + jobs uit de queue verwijderen)
+_CHECKPOINT_SIZE = 64
+# Jobs per pop-query en maximaal aantal jobs dat tegelijk bij de LLM in behandeling is
+_POP_CHUNK_SIZE = 32
+_MAX_IN_FLIGHT_JOBS = 128
+
+
+def _fit_abstract(title: str, abstract: str, max_tokens: int | None) -> tuple[str, bool]:
+    """Kort het abstract in tot title + abstract binnen het tokenbudget past.
+
+    Schatting: ±4 tekens per token. Begin en einde van het abstract blijven behouden
+    (daar staan doorgaans probleemstelling en conclusie); het midden vervalt.
+    """
+    if not max_tokens or (len(title) + len(abstract)) // 4 <= max_tokens:
+        return abstract, False
+    separator = " … "
+    budget = max(0, max_tokens * 4 - len(title) - len(separator))
+    head = budget // 2
+    tail = budget - head
+    return f"{abstract[:head]}{separator}{abstract[len(abstract) - tail:] if tail else ''}", True
+
 
 async def _run_labeling_async(labeling_jobs: int = 10) -> dict:
     logger = logging.getLogger(__name__)
-    database = PaperDatabase()
+    database = get_db()
 
-    stats = {"processed": 0, "labeled": 0, "skipped_missing": 0, "errors": 0}
+    stats = {"processed": 0, "labeled": 0, "skipped_missing": 0, "truncated": 0, "errors": 0}
+    classify_batch_size = max(1, int(LLM_GENERAL_CONFIG.get("classify_batch_size", 1)))
+    max_input_tokens = LLM_GENERAL_CONFIG.get("max_input_tokens")
     start_ts = time.perf_counter()
 
-    logger.info(
-        "🔖 Start labeling vanuit labeling_queue (rij-voor-rij), max jobs=%s", labeling_jobs
-    )
+    logger.info("🔖 Start labeling vanuit labeling_queue (batch), max jobs=%s", labeling_jobs)
 
-    # Jobs worden downstream non-blocking opgehaald en verrijkt
+    # Herstel: jobs van een afgebroken eerdere run weer beschikbaar maken
+    stale_minutes = int(PROCESSING_CONFIG.get("labeling_stale_minutes", 60))
+    requeued = await asyncio.to_thread(database.requeue_stale_labeling_jobs, stale_minutes)
+    if requeued:
+        logger.info("♻️  %s verlopen IN_FLIGHT jobs teruggezet naar PENDING", requeued)
 
     async with LLMClient() as llm_client:
         checker = LLMChecker(llm_client)
 
-        # Producer: haal jobs uit de queue en verrijk ze non-blocking
-        async def fetch_jobs_from_queue(limit: int) -> list[dict]:
-            fetched: list[dict] = []
-            for _ in range(int(limit)):
-                job = await asyncio.to_thread(database.pop_next_labeling_job)
-                if not job:
-                    break
-                fetched.append(job)
-            return fetched
-
-        async def enrich_stream(jobs_input: list[dict]):
-
-            async def _enrich(j: dict):
-                metadata_id = j.get("metadata_id")
-                question_id = j.get("question_id")
-                if not metadata_id or not isinstance(question_id, int):
-                    stats["skipped_missing"] += 1
-                    return None
-                qrow = await asyncio.to_thread(database.get_question_by_id, int(question_id))
-                if not qrow:
-                    stats["skipped_missing"] += 1
-                    return None
-                ta = await asyncio.to_thread(database.get_title_and_abstract, str(metadata_id))
-                if not ta:
-                    stats["skipped_missing"] += 1
-                    return None
-                return {
-                    "metadata_id": metadata_id,
-                    "question_id": question_id,
-                    "label_id": int(qrow["label_id"]),
-                    "prompt": qrow["prompt"],
-                    "title": ta["title"],
-                    "abstract": ta["abstract"],
-                }
-
-            tasks = [asyncio.create_task(_enrich(j)) for j in jobs_input]
-            for fut in asyncio.as_completed(tasks):
-                res = await fut
-                if res:
-                    yield res
-
-        # Consumer: classificeer verrijkte jobs en verwerk direct resultaten
-        enriched_queue: asyncio.Queue = asyncio.Queue()
-
-        async def producer():
-            raw_jobs = await fetch_jobs_from_queue(labeling_jobs)
-            async for ej in enrich_stream(raw_jobs):
-                await enriched_queue.put(ej)
-            await enriched_queue.put(None)  # sentinel
-
-        async def consumer():
-            classify_tasks: set[asyncio.Task] = set()
-
-            async def classify_and_handle(j: dict):
-                try:
-                    structured = await checker.classify_title_abstract_structured_async(
-                        question=j["prompt"], title=j["title"], abstract=j["abstract"]
-                    )
-                    error = None
-                except Exception as e:  # pragma: no cover
-                    structured, error = None, str(e)
-
-                if error or not isinstance(structured, dict):
-                    stats["errors"] += 1
-                    return
-
-                stats["processed"] += 1
-                counter = f"{stats['processed']:03d}"
-                if not bool(structured.get("answer_value")):
-                    logging.getLogger(__name__).info("%s ❌ %s", counter, j["title"])
-                    return
-
+        # Checkpoint per blok van _CHECKPOINT_SIZE afgeronde jobs: positieve labels upserten en
+        # de jobs uit de queue verwijderen in één transactie, in een thread, zodat DB-commits
+        # overlappen met nog lopende LLM-aanroepen
+        labeled_rows: list[tuple[str, int, float | None]] = []
+        done_jobs: list[tuple[str, int]] = []
+        flush_tasks: set[asyncio.Task] = set()
+
+        def checkpoint() -> None:
+            if not done_jobs and not labeled_rows:
+                return
+            labels, done = labeled_rows.copy(), done_jobs.copy()
+            labeled_rows.clear()
+            done_jobs.clear()
+            t = asyncio.create_task(
+                asyncio.to_thread(database.complete_labeling_jobs, labels, done)
+            )
+            flush_tasks.add(t)
+            t.add_done_callback(flush_tasks.discard)
+
+        classify_tasks: set[asyncio.Task] = set()
+
+        def handle_result(j: dict, structured: object) -> None:
+            if not isinstance(structured, dict):
+                # Job blijft IN_FLIGHT en wordt na labeling_stale_minutes opnieuw opgepakt
+                stats["errors"] += 1
+                return
+
+            stats["processed"] += 1
+            counter = f"{stats['processed']:03d}"
+            done_jobs.append((j["metadata_id"], j["question_id"]))
+            if bool(structured.get("answer_value")):
                 confidence = structured.get("confidence_score")
-                await asyncio.to_thread(
-                    database.upsert_metadata_label,
-                    j["metadata_id"],
-                    j["label_id"],
-                    confidence,
-                )
+                labeled_rows.append((j["metadata_id"], j["label_id"], confidence))
                 stats["labeled"] += 1
                 logging.getLogger(__name__).info("%s ✅ %s", counter, j["title"])
-
-            while True:
-                item = await enriched_queue.get()
-                if item is None:
+            else:
+                logging.getLogger(__name__).info("%s ❌ %s", counter, j["title"])
+            if len(done_jobs) >= _CHECKPOINT_SIZE:
+                checkpoint()
+
+        async def classify_group(group: list[dict]):
+            # Meerdere title/abstract-paren met dezelfde vraag in één LLM-aanroep
+            try:
+                results = await checker.classify_title_abstract_batch_async(
+                    question=group[0]["prompt"],
+                    items=[
+                        {"id": j["metadata_id"], "title": j["title"], "abstract": j["abstract"]}
+                        for j in group
+                    ],
+                )
+            except Exception:  # pragma: no cover
+                results = [None] * len(group)
+            for j, structured in zip(group, results):
+                handle_result(j, structured)
+
+        async def dispatch(group: list[dict]) -> None:
+            # Begrensd aantal lopende jobs: pas verder poppen als er ruimte is
+            while (
+                classify_tasks and len(classify_tasks) * classify_batch_size >= _MAX_IN_FLIGHT_JOBS
+            ):
+                await asyncio.wait(classify_tasks, return_when=asyncio.FIRST_COMPLETED)
+            t = asyncio.create_task(classify_group(group))
+            classify_tasks.add(t)
+            t.add_done_callback(classify_tasks.discard)
+
+        async def run_jobs():
+            # Jobs per blok poppen, verrijken en per vraag gegroepeerd direct als taak starten;
+            # het volgende blok wordt gepopt terwijl de vorige groepen nog geclassificeerd worden
+            pending_groups: dict[str, list[dict]] = {}
+            remaining = labeling_jobs
+            while remaining > 0:
+                # Eén query per blok: jobs poppen en direct verrijken met question + title/abstract
+                jobs = await asyncio.to_thread(
+                    database.pop_next_labeling_jobs, min(_POP_CHUNK_SIZE, remaining)
+                )
+                if not jobs:
                     break
-                t = asyncio.create_task(classify_and_handle(item))
-                classify_tasks.add(t)
-                t.add_done_callback(lambda _t: classify_tasks.discard(_t))
+                remaining -= len(jobs)
+                for j in jobs:
+                    # LEFT JOIN: None betekent dat question of metadata ontbreekt
+                    if j.get("label_id") is None or j.get("title") is None:
+                        stats["skipped_missing"] += 1
+                        done_jobs.append((j["metadata_id"], j["question_id"]))
+                        continue
+                    # Te lange invoer vooraf inkorten i.p.v. een mislukte LLM-aanroep afwachten
+                    abstract, truncated = _fit_abstract(
+                        j["title"], j["abstract"] or "", max_input_tokens
+                    )
+                    if truncated:
+                        stats["truncated"] += 1
+                    group = pending_groups.setdefault(j["prompt"], [])
+                    group.append(
+                        {
+                            "metadata_id": j["metadata_id"],
+                            "question_id": j["question_id"],
+                            "label_id": int(j["label_id"]),
+                            "prompt": j["prompt"],
+                            "title": j["title"],
+                            "abstract": abstract,
+                        }
+                    )
+                    if len(group) >= classify_batch_size:
+                        await dispatch(pending_groups.pop(j["prompt"]))
+            for group in pending_groups.values():
+                await dispatch(group)
 
             if classify_tasks:
                 await asyncio.gather(*classify_tasks)
 
-        await asyncio.gather(producer(), consumer())
+        try:
+            await run_jobs()
+        finally:
+            # Ook bij een fout de al geclassificeerde jobs vastleggen
+            checkpoint()
+            if flush_tasks:
+                await asyncio.gather(*flush_tasks)
 
     logging.getLogger(__name__).info(
-        "✅ Labeling klaar: processed=%s, labeled=%s, skipped_missing=%s, errors=%s",
+        "✅ Labeling klaar: processed=%s, labeled=%s, skipped_missing=%s, truncated=%s, errors=%s",
         stats["processed"],
         stats["labeled"],
         stats["skipped_missing"],
+        stats["truncated"],
         stats["errors"],
     )
     elapsed = time.perf_counter() - start_ts
@@ -131,5 +180,15 @@ async def _run_labeling_async(labeling_jobs: int = 10) -> dict:
     return stats
 
 
+def _loop_factory():
+    """uvloop indien geïnstalleerd (optioneel, alleen Unix); anders de standaard event loop."""
+    try:
+        import uvloop
+    except ImportError:
+        return None
+    return uvloop.new_event_loop
+
+
 def run_labeling(labeling_jobs: int = 10) -> dict:
-    return asyncio.run(_run_labeling_async(labeling_jobs))
+    with asyncio.Runner(loop_factory=_loop_factory()) as runner:
+        return runner.run(_run_labeling_async(labeling_jobs))
@@ -0,0 +1,81 @@
+import logging
+import os
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from src.config import STORAGE_CONFIG
+from src.logging_setup import setup_worker_logging, worker_log_queue
+from src.conversion.tex_converter import tex_naar_md
+from src.conversion.pdf_converter import pdf_naar_md
+from src.workflows.conversion import (
+    is_md_up_to_date,
+    load_md_cache,
+    save_md_cache,
+    source_signature,
+)
+from src.workflows.downloads import run_downloads
+
+_MD_DIR = Path(STORAGE_CONFIG["markdown_directory"])
+_TEX_DIR = Path(STORAGE_CONFIG["tex_directory"])
+_PDF_DIR = Path(STORAGE_CONFIG["pdf_directory"])
+
+
+def run_download_and_convert(limit: int | None = None) -> dict:
+    """Download en converteer overlappend i.p.v. na elkaar.
+
+    - Downloads blijven sequentieel (arXiv ToU: één verbinding, max 1 request per 3s)
+    - Elk gedownload bronbestand wordt direct ter conversie aangeboden:
+      - PDF -> MD in een ProcessPoolExecutor (CPU-bound)
+      - TeX -> MD in één achtergrondthread (pandoc is een eigen proces; de LLM-fallback
+        blijft zo binnen de LLM-semaphore van dit proces)
+    - Bestaande Markdown wordt overgeslagen als de bron niet gewijzigd is (zie convert_to_md)
+    """
+    logger = logging.getLogger(__name__)
+    _MD_DIR.mkdir(parents=True, exist_ok=True)
+
+    conversion = {
+        "converted_tex": 0,
+        "converted_pdf": 0,
+        "skipped_existing": 0,
+        "errors": 0,
+    }
+    futures: dict[Future, tuple[str, str]] = {}
+    md_cache = load_md_cache()
+    signatures: dict[str, tuple[int, int]] = {}
+
+    workers = int(STORAGE_CONFIG.get("convert_workers") or os.cpu_count() or 1)
+    with ProcessPoolExecutor(
+        max_workers=max(1, workers),
+        initializer=setup_worker_logging,
+        initargs=(worker_log_queue(),),
+    ) as pdf_pool, ThreadPoolExecutor(max_workers=1) as tex_pool:
+
+        def on_downloaded(arxiv_id: str, kind: str) -> None:
+            src_dir, suffix = (_PDF_DIR, ".pdf") if kind == "pdf" else (_TEX_DIR, ".tex")
+            signature = source_signature(src_dir / f"{arxiv_id}{suffix}")
+            md_exists = (_MD_DIR / f"{arxiv_id}.md").exists()
+            if is_md_up_to_date(md_cache, arxiv_id, signature, md_exists):
+                conversion["skipped_existing"] += 1
+                return
+            signatures[arxiv_id] = signature
+            if kind == "pdf":
+                fut = pdf_pool.submit(pdf_naar_md, arxiv_id)
+            else:
+                fut = tex_pool.submit(tex_naar_md, arxiv_id)
+            futures[fut] = (arxiv_id, kind)
+
+        downloads = run_downloads(limit=limit, on_downloaded=on_downloaded)
+        wait(futures)
+
+    for fut, (arxiv_id, kind) in futures.items():
+        try:
+            fut.result()
+            md_cache[arxiv_id] = signatures[arxiv_id]
+            conversion[f"converted_{kind}"] += 1
+            logger.info("✅ %s -> MD: %s", "TeX" if kind == "tex" else "PDF", arxiv_id)
+        except Exception as e:  # pragma: no cover
+            conversion["errors"] += 1
+            logger.error("❌ Conversie mislukt voor %s (%s): %s", arxiv_id, kind, e)
+    save_md_cache(md_cache)
+
+    return {"downloads": downloads, "conversion": conversion}
@@ -1,105 +1,170 @@
 import logging
-from src.database import PaperDatabase
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterator
+
+from src.database import get_db
 
 logger = logging.getLogger(__name__)
 
+# Maximaal aantal FAILED arxiv_ids in de samenvatting; de rest wordt alleen geteld
+_MAX_FAILED_DISPLAY = 500
+
+# Regelopmaak als gebonden str.format(_map): formatteren per rij gebeurt in C
+_QUESTION_LINE = "q_id: {id}, q_name: {name}, label_id: {label_id}, label: {label_name}".format_map
+_LABEL_LINE = "l_id: {id}, l_name: {name}".format_map
+_FAILED_LINE = "  - {}".format
+
+_STATS_TABLES = (
+    "metadata",
+    "papers",
+    "labels",
+    "questions",
+    "metadata_labels",
+    "labeling_queue",
+    "download_queue",
+)
+
+# Bestaande tabellen uit _STATS_TABLES; to_regclass geeft NULL voor een ontbrekende tabel
+_EXISTING_TABLES_SQL = "SELECT t FROM unnest(%s::text[]) AS t WHERE to_regclass(t) IS NOT NULL"
 
-def print_stats() -> None:
-    db = PaperDatabase()
-    table_counts: dict[str, int] = {}
+
+def _stats_sql(tables: tuple[str, ...]) -> str:
+    # Eén round-trip voor alle tellingen; de namen komen uit _STATS_TABLES (geen injectierisico)
+    return "SELECT " + ", ".join(f"(SELECT COUNT(1) FROM {t}) AS {t}" for t in tables)
+
+
+def _table_counts() -> dict[str, int]:
+    """Rijen per tabel; ontbrekende tabellen tellen als 0 zonder een mislukte query."""
+    db = get_db()
     with db._connect() as conn:
         cur = conn.cursor()
-        for table in [
-            "metadata",
-            "papers",
-            "labels",
-            "questions",
-            "metadata_labels",
-            "labeling_queue",
-            "download_queue",
-        ]:
-            try:
-                cur.execute(f"SELECT COUNT(1) AS count FROM {table}")
-                row = cur.fetchone()
-                table_counts[table] = row["count"] if row else 0
-            except Exception:
-                table_counts[table] = 0
-
-    print("\n" + "=" * 60)
-    print("DATABASE STATISTIEKEN")
-    print("=" * 60)
-    print("Tabellen (aantal rijen):")
-    for tbl in [
-        "metadata",
-        "papers",
-        "labels",
-        "questions",
-        "metadata_labels",
-        "labeling_queue",
-        "download_queue",
-    ]:
-        print(f"  {tbl}: {table_counts.get(tbl, 0)}")
-
-
-def list_questions() -> list[str]:
-    db = PaperDatabase()
-    qrows = db.list_questions()
-    lrows = db.list_labels()
+        cur.execute(_EXISTING_TABLES_SQL, (list(_STATS_TABLES),))
+        existing = {r["t"] for r in cur.fetchall()}
+        tables = tuple(t for t in _STATS_TABLES if t in existing)
+        row: dict = {}
+        if tables:
+            cur.execute(_stats_sql(tables))
+            row = cur.fetchone() or {}
+    return {t: int(row.get(t) or 0) for t in _STATS_TABLES}
+
+
+def _format_stats(table_counts: dict[str, int]) -> str:
+    lines = ["", "=" * 60, "DATABASE STATISTIEKEN", "=" * 60, "Tabellen (aantal rijen):"]
+    lines.extend(f"  {tbl}: {table_counts.get(tbl, 0)}" for tbl in _STATS_TABLES)
+    return "\n".join(lines) + "\n"
+
+
+def print_stats(table_counts: dict[str, int] | None = None) -> None:
+    if table_counts is None:
+        table_counts = _table_counts()
+    # Eén write i.p.v. een print() per regel
+    sys.stdout.write(_format_stats(table_counts))
+
+
+def list_questions_data() -> dict[str, list[dict]]:
+    """Questions en labels als rijen: {"questions": [...], "labels": [...]}."""
+    db = get_db()
+    # Eén round-trip voor questions én labels; rijen per sectie routeren op 'kind'
+    data: dict[str, list[dict]] = {"questions": [], "labels": []}
+    for r in db.list_questions_and_labels():
+        data["questions" if r["kind"] == "q" else "labels"].append(r)
+    return data
+
+
+def list_questions(data: dict[str, list[dict]] | None = None) -> list[str]:
+    if data is None:
+        data = list_questions_data()
     out: list[str] = []
     out.append("Questions:")
-    out.extend(
-        [
-            f"q_id: {r['id']}, q_name: {r['name']}, label_id: {r['label_id']}, label: {r['label_name']}"
-            for r in qrows
-        ]
-    )
+    out.extend(map(_QUESTION_LINE, data["questions"]))
     out.append("")
     out.append("Labels:")
-    out.extend([f"l_id: {r['id']}, l_name: {r['name']}"] for r in lrows)
+    out.extend(map(_LABEL_LINE, data["labels"]))
     return out
 
 
-def download_queue_summary() -> list[str]:
-    """Maak een samenvatting van de download_queue.
+def download_queue_summary_data() -> dict[str, Any]:
+    """Tellingen per status en (maximaal _MAX_FAILED_DISPLAY) FAILED ids.
 
-    - Geeft aantallen voor PENDING en COMPLETED
-    - Geeft de arxiv_ids weer voor FAILED
+    Vorm: {"counts": {"PENDING": n, "COMPLETED": n, "FAILED": n}, "failed_ids": [...]}
     """
-    db = PaperDatabase()
+    db = get_db()
+    counts: dict[str, int] = {"PENDING": 0, "COMPLETED": 0, "FAILED": 0}
+    failed_ids: list[str] = []
     with db._connect() as conn:
         cur = conn.cursor()
-
-        counts: dict[str, int] = {"PENDING": 0, "COMPLETED": 0, "FAILED": 0}
         try:
+            # Eén scan voor tellingen én FAILED ids: array_agg alleen over de FAILED-groep,
+            # begrensd tot _MAX_FAILED_DISPLAY elementen
             cur.execute(
-                "SELECT download_status, COUNT(1) AS cnt FROM download_queue GROUP BY download_status"
+                """
+                SELECT download_status,
+                       COUNT(1) AS cnt,
+                       (array_agg(arxiv_id ORDER BY created_at)
+                           FILTER (WHERE download_status = 'FAILED'))[1:%s] AS failed_ids
+                FROM download_queue
+                GROUP BY download_status
+                """,
+                (_MAX_FAILED_DISPLAY,),
             )
             for row in cur.fetchall():
                 status = row["download_status"]
-                cnt = int(row["cnt"]) if row["cnt"] is not None else 0
                 if status in counts:
-                    counts[status] = cnt
-        except Exception:
-            pass
+                    counts[status] = int(row["cnt"] or 0)
+                if row["failed_ids"]:
+                    failed_ids = list(row["failed_ids"])
+        except Exception as e:
+            logger.warning("Download queue samenvatting ophalen mislukt: %s", e)
+    return {"counts": counts, "failed_ids": failed_ids}
 
-        failed_ids: list[str] = []
-        try:
-            cur.execute(
-                "SELECT arxiv_id FROM download_queue WHERE download_status='FAILED' ORDER BY created_at"
-            )
-            failed_ids = [r["arxiv_id"] for r in cur.fetchall()]
-        except Exception:
-            failed_ids = []
-
-    lines: list[str] = []
-    lines.append("Download Queue Summary:")
-    lines.append(f"  PENDING:   {counts['PENDING']}")
-    lines.append(f"  COMPLETED: {counts['COMPLETED']}")
-    lines.append(f"  FAILED:    {counts['FAILED']}")
-    lines.append("")
-    lines.append("Failed arxiv_ids:")
-    if failed_ids:
-        lines.extend([f"  - {aid}" for aid in failed_ids])
-    else:
-        lines.append("  (geen)")
-    return lines
+
+def iter_download_queue_summary(data: dict[str, Any] | None = None) -> Iterator[str]:
+    """Maak regel voor regel een samenvatting van de download_queue.
+
+    - Geeft aantallen voor PENDING en COMPLETED
+    - Geeft de arxiv_ids weer voor FAILED (maximaal _MAX_FAILED_DISPLAY)
+    """
+    if data is None:
+        data = download_queue_summary_data()
+    counts, failed_ids = data["counts"], data["failed_ids"]
+
+    yield "Download Queue Summary:"
+    yield f"  PENDING:   {counts['PENDING']}"
+    yield f"  COMPLETED: {counts['COMPLETED']}"
+    yield f"  FAILED:    {counts['FAILED']}"
+    yield ""
+    yield "Failed arxiv_ids:"
+    if not failed_ids:
+        yield "  (geen)"
+        return
+    yield from map(_FAILED_LINE, failed_ids)
+    omitted = counts["FAILED"] - len(failed_ids)
+    if omitted > 0:
+        yield f"  … en nog {omitted} (niet getoond)"
+
+
+def download_queue_summary(data: dict[str, Any] | None = None) -> list[str]:
+    """Samenvatting van de download_queue als lijst (zie iter_download_queue_summary)."""
+    return list(iter_download_queue_summary(data))
+
+
+def all_reports() -> dict[str, Any]:
+    """Haal de data van alle rapportages tegelijk op, elk in een eigen thread.
+
+    BaseDatabase._connect() houdt een verbinding per thread aan, dus de queries lopen op
+    aparte verbindingen parallel; de totale duur is die van de traagste i.p.v. de som.
+    Renderen gebeurt door de aanroeper (print_stats, list_questions, download_queue_summary).
+    """
+    # Eerst in deze thread: lru_cache serialiseert een koude eerste aanroep niet, en drie
+    # gelijktijdige PaperDatabase()-instanties zouden de ensure_*-DDL parallel uitvoeren
+    get_db()
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        counts = executor.submit(_table_counts)
+        questions = executor.submit(list_questions_data)
+        download_queue = executor.submit(download_queue_summary_data)
+        return {
+            "table_counts": counts.result(),
+            "questions": questions.result(),
+            "download_queue": download_queue.result(),
+        }